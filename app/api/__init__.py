@@ -1 +1,21 @@
-# API module
\ No newline at end of file
+# API module
+from fastapi import APIRouter
+
+from app.api.http.health import router as health_router
+from app.api.http.auth import router as auth_router
+from app.api.http.users import router as users_router
+from app.api.http.documents import router as documents_router
+from app.api.http.collaboration import router as collaboration_router
+from app.api.ws.sync import router as websocket_router
+
+# Все маршруты приложения собираются в один роутер, который подключается к
+# приложению одним вызовом. Префикса нет: фронтенд обращается к API от корня
+api_router = APIRouter()
+api_router.include_router(health_router)
+api_router.include_router(auth_router)
+api_router.include_router(users_router)
+api_router.include_router(documents_router)
+api_router.include_router(collaboration_router)
+api_router.include_router(websocket_router)
+
+__all__ = ["api_router"]
@@ -99,13 +99,14 @@ async def get_current_user_info(
     import uuid
     from datetime import datetime
     
+    now = datetime.utcnow()
     return UserResponse(
         uuid=uuid.UUID("12345678-1234-5678-9abc-123456789abc"),
         email="demo@example.com",
         username="demo_user",
         is_active=True,
-        created_at=datetime.utcnow().isoformat(),
-        updated_at=datetime.utcnow().isoformat(),
+        created_at=now,
+        updated_at=now,
         word_count=0,
         content_length=0
     )
@@ -121,13 +122,14 @@ async def update_current_user(
     import uuid
     from datetime import datetime
     
+    now = datetime.utcnow()
     return UserResponse(
         uuid=uuid.UUID("12345678-1234-5678-9abc-123456789abc"),
         email=update_data.email or "demo@example.com",
         username=update_data.username or "demo_user",
         is_active=True,
-        created_at=datetime.utcnow().isoformat(),
-        updated_at=datetime.utcnow().isoformat(),
+        created_at=now,
+        updated_at=now,
         word_count=0,
         content_length=0
     )
@@ -155,11 +157,11 @@ async def refresh_token(
 ):
     """Обновление токена (демо режим)"""
     # В демо режиме создаем фиктивный токен
-    from app.core.security import create_access_token
+    from app.core.security import create_access_token, encode_subject
     import uuid
     
     token_data = {
-        "sub": str(uuid.UUID("12345678-1234-5678-9abc-123456789abc")),
+        "sub": encode_subject(uuid.UUID("12345678-1234-5678-9abc-123456789abc")),
         "username": "demo_user",
         "email": "demo@example.com"
     }
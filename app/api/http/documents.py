@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
+from urllib.parse import quote
 import uuid
 
 from app.core.db import get_db
 from app.domains.documents.schemas import (
     DocumentCreate, DocumentUpdate, DocumentResponse, DocumentListResponse,
     DocumentSearchRequest, DocumentSearchResponse, DocumentStatsResponse,
-    DocumentExportRequest, DocumentExportResponse
+    DocumentExportRequest
 )
 from app.domains.documents.services import DocumentService, DocumentVersionService
 from app.domains.identity.entities import User
@@ -27,7 +29,7 @@ async def create_document(
     default_user_uuid = uuid.UUID("c1de4629-e46b-4baf-b401-da37097508f7")
     document = await document_service.create_document(document_data, default_user_uuid)
     
-    return DocumentResponse(
+    return DocumentResponse.model_construct(
         uuid=document.uuid,
         title=document.title,
         content=document.content,
@@ -63,8 +65,10 @@ async def get_user_documents(
     repo = DocumentRepository(db)
     total = await repo.count_by_owner(default_user_uuid)
     
+    # Данные пришли из БД и уже прошли валидацию при сохранении,
+    # поэтому собираем ответы без повторной проверки полей
     document_responses = [
-        DocumentResponse(
+        DocumentResponse.model_construct(
             uuid=doc.uuid,
             title=doc.title,
             content=doc.content,
@@ -102,7 +106,7 @@ async def get_document(
             detail="Document not found"
         )
     
-    return DocumentResponse(
+    return DocumentResponse.model_construct(
         uuid=document.uuid,
         title=document.title,
         content=document.content,
@@ -140,7 +144,7 @@ async def update_document(
                 detail="Document not found"
             )
         
-        return DocumentResponse(
+        return DocumentResponse.model_construct(
             uuid=document.uuid,
             title=document.title,
             content=document.content,
@@ -157,6 +161,11 @@ async def update_document(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=str(e)
         )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
 
 
 @router.delete("/{document_uuid}", status_code=status.HTTP_204_NO_CONTENT)
@@ -199,25 +208,15 @@ async def search_documents(
     offset = (page - 1) * per_page
     # Используем существующего пользователя для демонстрации
     default_user_uuid = uuid.UUID("c1de4629-e46b-4baf-b401-da37097508f7")
-    documents, search_time = await document_service.search_documents(
+    documents, total_found, search_time = await document_service.search_documents(
         search_request,
         user_id=default_user_uuid,
         limit=per_page,
         offset=offset
     )
     
-    # Получаем общее количество результатов
-    from app.db.repositories.document_repository import DocumentRepository
-    repo = DocumentRepository(db)
-    total_found = await repo.count_search_results(
-        search_request.query,
-        default_user_uuid,
-        search_request.search_in_title,
-        search_request.search_in_content
-    )
-    
     document_responses = [
-        DocumentResponse(
+        DocumentResponse.model_construct(
             uuid=doc.uuid,
             title=doc.title,
             content=doc.content,
@@ -258,7 +257,7 @@ async def get_document_stats(
     return DocumentStatsResponse(**stats)
 
 
-@router.post("/{document_uuid}/export", response_model=DocumentExportResponse)
+@router.post("/{document_uuid}/export")
 async def export_document(
     document_uuid: uuid.UUID,
     export_request: DocumentExportRequest,
@@ -279,7 +278,12 @@ async def export_document(
             detail="Document not found"
         )
     
-    return DocumentExportResponse(**export_data)
+    filename, media_type, chunks = export_data
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
 
 
 # Версии документов
@@ -345,7 +349,7 @@ async def restore_document_version(
                 detail="Document or version not found"
             )
         
-        return DocumentResponse(
+        return DocumentResponse.model_construct(
             uuid=document.uuid,
             title=document.title,
             content=document.content,
@@ -361,4 +365,9 @@ async def restore_document_version(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
         )
\ No newline at end of file
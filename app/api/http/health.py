@@ -1,7 +1,25 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+
+from app.api.http.auth import get_current_active_user
+from app.core.db import engine
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
     return {"status":"ok"}
+
+
+# Состояние пула раскрывает внутренности сервера, поэтому доступно только
+# аутентифицированным пользователям
+@router.get("/health/db", dependencies=[Depends(get_current_active_user)])
+async def db_pool_health():
+    """Состояние пула соединений: рост checked_out и overflow говорит о насыщении"""
+    pool = engine.pool
+    return {
+        "status": pool.status(),
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow()
+    }
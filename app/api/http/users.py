@@ -89,7 +89,7 @@ async def get_user_documents(
     from app.domains.documents.schemas import DocumentResponse
     
     document_responses = [
-        DocumentResponse(
+        DocumentResponse.model_construct(
             uuid=doc.uuid,
             title=doc.title,
             content=doc.content,
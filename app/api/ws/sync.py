@@ -3,6 +3,9 @@ from typing import Dict, List
 import json
 import asyncio
 import logging
+import uuid
+
+from app.services.persistence import snapshot_flusher
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +70,12 @@ class ConnectionManager:
                 if document_id in self.document_operations:
                     del self.document_operations[document_id]
         
+        # Правки, записанные по WebSocket, фиксируются версией
+        try:
+            snapshot_flusher.release(uuid.UUID(document_id))
+        except ValueError:
+            pass
+        
         logger.info(f"User {user_id} disconnected from document {document_id}")
 
     async def broadcast_to_document(self, document_id: str, message: dict, exclude_user: str = None):
@@ -98,6 +107,13 @@ class ConnectionManager:
         
         self.document_operations[document_id].append(operation)
         
+        # Полное содержимое документа сохраняется в БД в фоне, от имени автора
+        if operation.get("type") == "replace" and isinstance(operation.get("content"), str):
+            try:
+                snapshot_flusher.enqueue(uuid.UUID(document_id), uuid.UUID(user_id), operation["content"])
+            except ValueError:
+                logger.warning(f"Skipping snapshot with invalid ids: document {document_id}, user {user_id}")
+        
         # Рассылаем операцию другим пользователям
         await self.broadcast_to_document(document_id, {
             "type": "operation",
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from app.core.config import settings
+
+# Клиент создается лениво: соединение открывается при первом запросе.
+# Без REDIS_URL кеширование отключено и сервисы работают напрямую с БД
+redis_client: Optional[Redis] = Redis.from_url(settings.redis_url) if settings.redis_url else None
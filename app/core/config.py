@@ -1,9 +1,22 @@
+from typing import List, Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
     jwt_secret: str
     jwt_algorithm: str = "HS256"
+    redis_url: Optional[str] = None
+    # Пул соединений с БД
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800
+    db_pool_timeout: float = 5
+    # Разрешенные источники CORS через запятую. Встроенный фронтенд
+    # обращается к API с того же домена и в CORS не нуждается
+    cors_origins: str = "http://localhost:8080"
+    # development | production: в продакшене статика кешируется и сжимается
+    env: str = "development"
     
     # PostgreSQL variables for Docker
     postgres_user: str = ""
@@ -12,4 +25,8 @@ class Settings(BaseSettings):
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
+    @property
+    def cors_origin_list(self) -> List[str]:
+        return [origin.strip() for origin in self.cors_origins.split(",") if origin.strip()]
+
 settings = Settings()
\ No newline at end of file
@@ -2,14 +2,40 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, Asyn
 
 from app.core.config import settings
 
-engine = create_async_engine(settings.database_url, echo=False)
-SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+engine = create_async_engine(
+    settings.database_url,
+    echo=False,
+    # Пул рассчитан на одновременные запросы одного процесса; соединения
+    # пересоздаются раньше, чем их закроет БД или PgBouncer по простою
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_timeout=settings.db_pool_timeout,
+    pool_pre_ping=True,
+    # Кеш скомпилированного SQL на стороне SQLAlchemy
+    query_cache_size=1200,
+    # Кеш подготовленных выражений asyncpg: планы горячих запросов
+    # переиспользуются в рамках соединения
+    connect_args={
+        "prepared_statement_cache_size": 500,
+        "statement_cache_size": 500,
+    },
+)
+# Репозитории сбрасывают изменения явно через flush
+SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
 
 
 async def get_db() -> AsyncSession:
-    """Dependency for getting async database session."""
+    """Dependency for getting async database session.
+
+    Repositories only flush; each service use case commits once. Anything left
+    uncommitted when the request fails is rolled back here.
+    """
     async with SessionLocal() as session:
         try:
             yield session
+        except Exception:
+            await session.rollback()
+            raise
         finally:
             await session.close()
@@ -1,3 +1,5 @@
+import base64
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import JWTError, jwt
@@ -5,18 +7,34 @@ from passlib.context import CryptContext
 
 from app.core.config import settings
 
-# Контекст для хеширования паролей
+# Контекст хеширования создается один раз на процесс: построение CryptContext
+# дорогое, а bcrypt использует нативный бэкенд пакета bcrypt
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверка пароля"""
-    return pwd_context.verify(plain_password, hashed_password)
+    # bcrypt учитывает только первые 72 байта
+    return pwd_context.verify(plain_password[:72], hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Хеширование пароля"""
-    return pwd_context.hash(password)
+    # bcrypt имеет ограничение 72 байта, обрезаем пароль если нужно
+    return pwd_context.hash(password[:72])
+
+
+def encode_subject(user_uuid: uuid.UUID) -> str:
+    """Кодирование UUID пользователя для поля sub: base64url от 16 байт (22 символа)"""
+    return base64.urlsafe_b64encode(user_uuid.bytes).rstrip(b"=").decode()
+
+
+def decode_subject(subject: str) -> uuid.UUID:
+    """Декодирование поля sub в UUID пользователя"""
+    if len(subject) == 22:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(subject + "=="))
+    # Токены, выпущенные до перехода на base64url, содержат строковый UUID
+    return uuid.UUID(subject)
 
 
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
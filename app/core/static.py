@@ -0,0 +1,114 @@
+import mimetypes
+import os
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import anyio
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+# Ассеты с версией в URL (?v=...) не меняются: новая версия получает новый URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Ассеты без версии кешируются, но каждый раз проверяются по ETag / Last-Modified
+REVALIDATE_CACHE_CONTROL = "public, max-age=0, must-revalidate"
+
+# Предварительно сжатые копии файлов в порядке предпочтения
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class NoCacheStaticFiles(StaticFiles):
+    """Статика для разработки: браузер проверяет каждый файл при каждой загрузке
+
+    no-cache (в отличие от no-store) разрешает хранить копию и отправлять
+    условные запросы: неизмененный файл возвращается как 304 по ETag и
+    Last-Modified, которые выставляет StaticFiles
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Кодировки из Accept-Encoding с их q-значениями"""
+    encodings = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[token] = quality
+    return encodings
+
+
+def _is_versioned(scope: Scope) -> bool:
+    """URL ассета содержит версию: параметр v с непустым значением"""
+    query_string = scope.get("query_string", b"").decode("latin-1")
+    return "v" in parse_qs(query_string)
+
+
+class CachedStaticFiles(StaticFiles):
+    """Статика для продакшена: долгое кеширование и предварительно сжатые копии
+
+    Если рядом с файлом лежит app.js.br или app.js.gz и клиент их принимает,
+    отдается сжатая копия без сжатия на лету.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        request_headers = Headers(scope=scope)
+        response, has_variants = await self._precompressed_response(path, request_headers)
+        if response is None:
+            response = await super().get_response(path, scope)
+            if has_variants:
+                # Ответ зависит от Accept-Encoding, даже если отдан несжатый файл
+                response.headers["Vary"] = "Accept-Encoding"
+
+        if response.status_code in (200, 304):
+            if _is_versioned(scope):
+                response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            else:
+                response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
+
+    async def _precompressed_response(
+        self,
+        path: str,
+        request_headers: Headers
+    ) -> Tuple[Optional[Response], bool]:
+        """Сжатая копия файла, если клиент ее принимает, и признак наличия сжатых копий"""
+        encodings = _accepted_encodings(request_headers.get("accept-encoding", ""))
+        has_variants = False
+        for encoding, suffix in _PRECOMPRESSED:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+            has_variants = True
+            if encodings.get(encoding, encodings.get("*", 0.0)) <= 0:
+                continue
+
+            media_type = mimetypes.guess_type(os.path.basename(path))[0] or "application/octet-stream"
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers), True
+            return response, True
+
+        return None, has_variants
@@ -76,10 +76,16 @@ async def run_async_migrations() -> None:
     # Используем URL из настроек приложения, а не из alembic.ini
     configuration = {"sqlalchemy.url": get_url()}
     
+    # Кеш подготовленных выражений отключен: DDL миграций делает
+    # закешированные планы недействительными
     connectable = async_engine_from_config(
         configuration,
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
+        connect_args={
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+        },
     )
 
     async with connectable.connect() as connection:
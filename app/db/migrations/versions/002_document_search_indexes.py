@@ -0,0 +1,45 @@
+"""Add GIN indexes for document search
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Выражения индексов должны совпадать с условиями в DocumentRepository.search
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS documents_title_fts ON documents "
+        "USING GIN (to_tsvector('simple', title))"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS documents_content_fts ON documents "
+        "USING GIN (to_tsvector('simple', content))"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS documents_title_trgm ON documents "
+        "USING GIN (title gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS documents_content_trgm ON documents "
+        "USING GIN (content gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS documents_content_trgm")
+    op.execute("DROP INDEX IF EXISTS documents_title_trgm")
+    op.execute("DROP INDEX IF EXISTS documents_content_fts")
+    op.execute("DROP INDEX IF EXISTS documents_title_fts")
@@ -0,0 +1,30 @@
+"""Add covering index for owner document listing
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Покрывает DocumentRepository.get_by_owner: фильтр по владельцу
+    # и сортировка по updated_at DESC без отдельного шага сортировки
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS documents_owner_updated_idx ON documents "
+        "(owner_id, updated_at DESC) INCLUDE (uuid, title)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS documents_owner_updated_idx")
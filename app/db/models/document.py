@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, ForeignKey, UUID
+from sqlalchemy import Column, String, Text, Integer, ForeignKey, UUID, Index, func, literal_column, text
 from sqlalchemy.orm import relationship
 
 from app.db.base import BaseModel
@@ -12,6 +12,14 @@ class Document(BaseModel):
     version = Column(Integer, default=1)
     owner_id = Column(UUID(as_uuid=True), ForeignKey("users.uuid"), nullable=False)
     
+    __table_args__ = (
+        Index("documents_title_fts", func.to_tsvector(literal_column("'simple'"), title), postgresql_using="gin"),
+        Index("documents_content_fts", func.to_tsvector(literal_column("'simple'"), content), postgresql_using="gin"),
+        Index("documents_title_trgm", title, postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("documents_content_trgm", content, postgresql_using="gin", postgresql_ops={"content": "gin_trgm_ops"}),
+        Index("documents_owner_updated_idx", owner_id, text("updated_at DESC"), postgresql_include=["uuid", "title"]),
+    )
+    
     # Relationships
     owner = relationship("User", back_populates="owned_documents")
     versions = relationship("DocumentVersion", back_populates="document", cascade="all, delete-orphan")
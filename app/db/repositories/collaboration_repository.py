@@ -1,6 +1,6 @@
 from typing import Optional, List, TYPE_CHECKING
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, func, and_
+from sqlalchemy import select, insert, update, delete, func, and_
 from sqlalchemy.exc import IntegrityError
 import uuid
 from datetime import datetime, timedelta
@@ -8,6 +8,7 @@ from datetime import datetime, timedelta
 from app.db.models.collaboration import (
     DocumentSession as DocumentSessionModel,
     Operation as OperationModel,
+    OperationType as OperationTypeModel,
     UserCursor as UserCursorModel
 )
 
@@ -33,7 +34,7 @@ class DocumentSessionRepository:
         )
         
         self.session.add(db_session)
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(db_session)
         return self._to_domain(db_session)
     
@@ -91,7 +92,6 @@ class DocumentSessionRepository:
         )
         
         await self.session.execute(stmt)
-        await self.session.commit()
         
         return await self.get_by_uuid(session.uuid)
     
@@ -103,7 +103,6 @@ class DocumentSessionRepository:
             .values(is_active=False, last_activity=datetime.utcnow())
         )
         result = await self.session.execute(stmt)
-        await self.session.commit()
         return result.rowcount > 0
     
     async def cleanup_inactive_sessions(self, minutes: int = 30) -> int:
@@ -118,7 +117,6 @@ class DocumentSessionRepository:
         )
         
         result = await self.session.execute(stmt)
-        await self.session.commit()
         return result.rowcount
     
     async def count_active_sessions(self, document_id: uuid.UUID) -> int:
@@ -172,10 +170,33 @@ class OperationRepository:
         )
         
         self.session.add(db_operation)
-        await self.session.commit()
+        await self.session.flush()
         await self.session.refresh(db_operation)
         return self._to_domain(db_operation)
     
+    async def append_operations(self, document_id: uuid.UUID, operations: List["Operation"]) -> None:
+        """Добавление пакета операций документа одним многострочным INSERT"""
+        if not operations:
+            return
+        
+        await self.session.execute(
+            insert(OperationModel),
+            [
+                {
+                    "uuid": operation.uuid,
+                    "document_id": document_id,
+                    "user_id": operation.author_id,
+                    "operation_type": OperationTypeModel(operation.operation_type.value),
+                    "position": operation.position,
+                    "content": operation.content,
+                    "length": operation.length,
+                    "version": operation.version,
+                    "timestamp": operation.timestamp
+                }
+                for operation in operations
+            ]
+        )
+    
     async def get_by_uuid(self, operation_uuid: uuid.UUID) -> Optional["Operation"]:
         """Получение операции по UUID"""
         result = await self.session.execute(
@@ -259,7 +280,6 @@ class OperationRepository:
         )
         
         result = await self.session.execute(stmt)
-        await self.session.commit()
         return result.rowcount
     
     def _to_domain(self, db_operation: OperationModel) -> "Operation":
@@ -327,7 +347,7 @@ class UserCursorRepository:
             )
             self.session.add(db_cursor)
         
-        await self.session.commit()
+        await self.session.flush()
     
     async def get_active_cursors(self, document_id: uuid.UUID) -> List[dict]:
         """Получение активных курсоров документа"""
@@ -361,7 +381,6 @@ class UserCursorRepository:
             )
         )
         await self.session.execute(stmt)
-        await self.session.commit()
     
     async def cleanup_old_cursors(self, minutes: int = 10) -> int:
         """Очистка старых курсоров"""
@@ -369,5 +388,4 @@ class UserCursorRepository:
         
         stmt = delete(UserCursorModel).where(UserCursorModel.updated_at < cutoff_time)
         result = await self.session.execute(stmt)
-        await self.session.commit()
         return result.rowcount
\ No newline at end of file
@@ -1,62 +1,220 @@
-from typing import Optional, List, TYPE_CHECKING
+from typing import Optional, List, Dict, Tuple, AsyncIterator, TYPE_CHECKING
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy import select, insert, update, delete, func, and_, or_, literal_column, text, bindparam, values, column
+from sqlalchemy import DateTime, Text, UUID
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import raiseload
+from datetime import datetime
 import uuid
 
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
 from app.db.models.document import Document as DocumentModel, DocumentVersion as DocumentVersionModel
+from app.core.cache import redis_client
+from app.db.repositories.loaders import DocumentLoader, DOCUMENT_COLUMNS
 
 if TYPE_CHECKING:
     from app.domains.documents.entities import Document, DocumentVersion
 
+# Конфигурация подставляется литералом, а не параметром: только так выражение
+# совпадает с выражением GIN-индексов documents_*_fts и планировщик их использует
+_TS_CONFIG = literal_column("'simple'")
+
+# Слова и абзацы считаются по тем же правилам, что и в сущности Document:
+# непробельные последовательности и строки, содержащие непробельный символ
+_STATS_QUERY = text(r"""
+    SELECT
+        d.uuid AS document_id,
+        d.title AS title,
+        (SELECT count(*) FROM regexp_matches(coalesce(d.content, ''), '\S+', 'g')) AS word_count,
+        char_length(coalesce(d.content, '')) AS character_count,
+        (
+            SELECT count(*)
+            FROM regexp_split_to_table(coalesce(d.content, ''), '\n') AS line
+            WHERE line ~ '\S'
+        ) AS paragraph_count,
+        (SELECT count(*) FROM document_versions v WHERE v.document_id = d.uuid) AS version_count,
+        d.updated_at AS last_modified,
+        d.created_at AS created_at
+    FROM documents d
+    WHERE d.uuid = :document_uuid
+""")
+
+# Время жизни закешированного документа, в секундах
+ENTITY_CACHE_TTL = 60
+
+
+def document_cache_key(document_uuid: uuid.UUID) -> str:
+    """Ключ Redis, под которым кешируется сущность документа"""
+    return f"doc:entity:{document_uuid}"
+
+
+# Сущности домена строятся только из колонок документа: любая ленивая загрузка
+# связей (owner, versions, sessions) - ошибка, а не скрытый запрос N+1
+_NO_LAZY_LOADS = raiseload("*")
+
+# Горячие запросы строятся один раз при импорте: все значения передаются через
+# bindparam, поэтому ключ кеша скомпилированных запросов у них постоянный
+_SELECT_ACCESS_INFO = (
+    select(DocumentModel.owner_id, DocumentModel.updated_at)
+    .where(DocumentModel.uuid == bindparam("doc_uuid"))
+)
+
+_SELECT_BY_OWNER = (
+    select(*DOCUMENT_COLUMNS)
+    .where(DocumentModel.owner_id == bindparam("owner_uuid"))
+    .order_by(DocumentModel.updated_at.desc())
+    .offset(bindparam("page_offset"))
+    .limit(bindparam("page_limit"))
+)
+
+_COUNT_BY_OWNER = (
+    select(func.count(DocumentModel.uuid))
+    .where(DocumentModel.owner_id == bindparam("owner_uuid"))
+)
+
 
 class DocumentRepository:
     """Репозиторий для работы с документами"""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, redis: Optional[Redis] = None):
         self.session = session
+        self.redis = redis if redis is not None else redis_client
+        self.loader = DocumentLoader.for_session(session, self._to_domain)
+    
+    async def _get_cached(self, document_uuid: uuid.UUID) -> Optional["Document"]:
+        """Документ из кеша Redis или None при промахе"""
+        if self.redis is None:
+            return None
+        try:
+            cached = await self.redis.get(document_cache_key(document_uuid))
+        except RedisError:
+            return None
+        if cached is None:
+            return None
+        
+        from app.domains.documents.entities import Document
+        
+        data = orjson.loads(cached)
+        return Document(
+            uuid=uuid.UUID(data["uuid"]),
+            title=data["title"],
+            content=data["content"],
+            version=data["version"],
+            owner_id=uuid.UUID(data["owner_id"]) if data["owner_id"] else None,
+            created_at=datetime.fromisoformat(data["created_at"]),
+            updated_at=datetime.fromisoformat(data["updated_at"])
+        )
+    
+    async def _set_cached(self, document: "Document") -> None:
+        """Сохранение документа в кеш Redis"""
+        if self.redis is None:
+            return
+        payload = orjson.dumps({
+            "uuid": document.uuid,
+            "title": document.title,
+            "content": document.content,
+            "version": document.version,
+            "owner_id": document.owner_id,
+            "created_at": document.created_at,
+            "updated_at": document.updated_at
+        })
+        try:
+            await self.redis.set(document_cache_key(document.uuid), payload, ex=ENTITY_CACHE_TTL)
+        except RedisError:
+            pass
     
     async def create(self, document: "Document") -> "Document":
         """Создание нового документа"""
-        db_document = DocumentModel(
+        from app.domains.documents.entities import Document
+        
+        # Метки времени выставляет БД; RETURNING избавляет от отдельного refresh
+        stmt = (
+            insert(DocumentModel)
+            .values(
+                uuid=document.uuid,
+                title=document.title,
+                content=document.content,
+                version=document.version,
+                owner_id=document.owner_id
+            )
+            .returning(DocumentModel.created_at, DocumentModel.updated_at)
+        )
+        
+        try:
+            row = (await self.session.execute(stmt)).one()
+        except IntegrityError:
+            raise ValueError("Invalid owner_id")
+        
+        self.loader.clear(document.uuid)
+        return Document(
             uuid=document.uuid,
             title=document.title,
             content=document.content,
             version=document.version,
-            owner_id=document.owner_id
+            owner_id=document.owner_id,
+            created_at=row.created_at,
+            updated_at=row.updated_at
         )
+    
+    async def get_by_uuid(self, document_uuid: uuid.UUID, use_cache: bool = True) -> Optional["Document"]:
+        """Получение документа по UUID
+
+        Кеш Redis допускает устаревание, поэтому изменения документа должны
+        опираться на данные из БД: use_cache=False читает в обход кеша.
+        """
+        if not use_cache:
+            return await self.loader.load(document_uuid)
         
-        self.session.add(db_document)
-        try:
-            await self.session.commit()
-            await self.session.refresh(db_document)
-            return self._to_domain(db_document)
-        except IntegrityError:
-            await self.session.rollback()
-            raise ValueError("Invalid owner_id")
+        document = await self._get_cached(document_uuid)
+        if document is not None:
+            return document
+        
+        # Одновременные запросы в рамках запроса объединяются загрузчиком
+        document = await self.loader.load(document_uuid)
+        if document is not None:
+            await self._set_cached(document)
+        return document
     
-    async def get_by_uuid(self, document_uuid: uuid.UUID) -> Optional["Document"]:
-        """Получение документа по UUID"""
+    async def get_access_info(self, document_uuid: uuid.UUID) -> Optional[dict]:
+        """Владелец и время изменения документа без загрузки содержимого"""
+        result = await self.session.execute(_SELECT_ACCESS_INFO, {"doc_uuid": document_uuid})
+        row = result.mappings().one_or_none()
+        return dict(row) if row else None
+    
+    async def get_by_uuids(self, document_uuids: List[uuid.UUID]) -> List["Document"]:
+        """Получение документов по списку UUID с сохранением порядка списка"""
+        if not document_uuids:
+            return []
+        
         result = await self.session.execute(
-            select(DocumentModel).where(DocumentModel.uuid == document_uuid)
+            select(*DOCUMENT_COLUMNS).where(DocumentModel.uuid.in_(document_uuids))
         )
-        db_document = result.scalar_one_or_none()
-        return self._to_domain(db_document) if db_document else None
+        documents = {row.uuid: self._to_domain(row) for row in result.all()}
+        return [documents[document_uuid] for document_uuid in document_uuids if document_uuid in documents]
+    
+    async def get_stats(self, document_uuid: uuid.UUID) -> Optional[dict]:
+        """Статистика документа, посчитанная на стороне БД без передачи содержимого"""
+        result = await self.session.execute(_STATS_QUERY, {"document_uuid": document_uuid})
+        row = result.mappings().one_or_none()
+        return dict(row) if row else None
     
     async def get_by_owner(self, owner_id: uuid.UUID, limit: int = 100, offset: int = 0) -> List["Document"]:
         """Получение документов по владельцу"""
         result = await self.session.execute(
-            select(DocumentModel)
-            .where(DocumentModel.owner_id == owner_id)
-            .order_by(DocumentModel.updated_at.desc())
-            .offset(offset)
-            .limit(limit)
+            _SELECT_BY_OWNER,
+            {"owner_uuid": owner_id, "page_offset": offset, "page_limit": limit}
         )
-        db_documents = result.scalars().all()
-        return [self._to_domain(doc) for doc in db_documents]
+        return [self._to_domain(row) for row in result.all()]
     
-    async def update(self, document: "Document") -> "Document":
-        """Обновление документа"""
+    async def update(self, document: "Document", expected_version: Optional[int] = None) -> Optional["Document"]:
+        """Обновление документа
+
+        expected_version - версия, от которой считались изменения: если документ
+        успели изменить, строка не обновляется и возвращается None.
+        """
         stmt = (
             update(DocumentModel)
             .where(DocumentModel.uuid == document.uuid)
@@ -67,17 +225,66 @@ class DocumentRepository:
                 updated_at=document.updated_at
             )
         )
+        if expected_version is not None:
+            stmt = stmt.where(DocumentModel.version == expected_version)
+        
+        result = await self.session.execute(stmt)
+        self.loader.clear(document.uuid)
+        if result.rowcount == 0:
+            return None
+        
+        # Кеш Redis сбрасывается только после commit, поэтому здесь
+        # документ перечитывается в обход него
+        return await self.loader.load(document.uuid)
+    
+    async def get_owners(self, document_uuids: List[uuid.UUID]) -> Dict[uuid.UUID, uuid.UUID]:
+        """Владельцы документов одним запросом, без загрузки содержимого"""
+        if not document_uuids:
+            return {}
+        
+        result = await self.session.execute(
+            select(DocumentModel.uuid, DocumentModel.owner_id).where(DocumentModel.uuid.in_(document_uuids))
+        )
+        return {row.uuid: row.owner_id for row in result.all()}
+    
+    async def update_contents(self, contents: List[Tuple[uuid.UUID, str, datetime]]) -> List[uuid.UUID]:
+        """Запись содержимого нескольких документов одним UPDATE ... FROM (VALUES ...)
+
+        contents - тройки (UUID документа, содержимое, время снимка). Строка
+        обновляется, только если документ не менялся после снимка; время
+        изменения становится временем снимка. Версия документа не меняется.
+        Возвращает UUID обновленных документов.
+        """
+        if not contents:
+            return []
         
-        await self.session.execute(stmt)
-        await self.session.commit()
+        snapshots = values(
+            column("doc_uuid", UUID(as_uuid=True)),
+            column("doc_content", Text),
+            column("captured_at", DateTime(timezone=True)),
+            name="snapshots"
+        ).data(contents)
+        stmt = (
+            update(DocumentModel)
+            .where(
+                DocumentModel.uuid == snapshots.c.doc_uuid,
+                DocumentModel.updated_at <= snapshots.c.captured_at
+            )
+            .values(content=snapshots.c.doc_content, updated_at=snapshots.c.captured_at)
+            .returning(DocumentModel.uuid)
+        )
         
-        return await self.get_by_uuid(document.uuid)
+        result = await self.session.execute(stmt)
+        updated = list(result.scalars())
+        for document_uuid in updated:
+            self.loader.clear(document_uuid)
+        return updated
     
     async def delete(self, document_uuid: uuid.UUID) -> bool:
         """Удаление документа"""
         stmt = delete(DocumentModel).where(DocumentModel.uuid == document_uuid)
         result = await self.session.execute(stmt)
-        await self.session.commit()
+        self.loader.clear(document_uuid)
         return result.rowcount > 0
     
     async def search(
@@ -90,18 +297,12 @@ class DocumentRepository:
         offset: int = 0
     ) -> List["Document"]:
         """Поиск документов"""
-        conditions = []
-        
-        if search_in_title:
-            conditions.append(DocumentModel.title.ilike(f"%{query}%"))
-        
-        if search_in_content:
-            conditions.append(DocumentModel.content.ilike(f"%{query}%"))
+        conditions = self._search_conditions(query, search_in_title, search_in_content)
         
         if not conditions:
             return []
         
-        base_query = select(DocumentModel).where(or_(*conditions))
+        base_query = select(*DOCUMENT_COLUMNS).where(or_(*conditions))
         
         if owner_id:
             base_query = base_query.where(DocumentModel.owner_id == owner_id)
@@ -113,14 +314,11 @@ class DocumentRepository:
             .limit(limit)
         )
         
-        db_documents = result.scalars().all()
-        return [self._to_domain(doc) for doc in db_documents]
+        return [self._to_domain(row) for row in result.all()]
     
     async def count_by_owner(self, owner_id: uuid.UUID) -> int:
         """Подсчет количества документов владельца"""
-        result = await self.session.execute(
-            select(func.count(DocumentModel.uuid)).where(DocumentModel.owner_id == owner_id)
-        )
+        result = await self.session.execute(_COUNT_BY_OWNER, {"owner_uuid": owner_id})
         return result.scalar()
     
     async def count_search_results(
@@ -131,13 +329,7 @@ class DocumentRepository:
         search_in_content: bool = True
     ) -> int:
         """Подсчет результатов поиска"""
-        conditions = []
-        
-        if search_in_title:
-            conditions.append(DocumentModel.title.ilike(f"%{query}%"))
-        
-        if search_in_content:
-            conditions.append(DocumentModel.content.ilike(f"%{query}%"))
+        conditions = self._search_conditions(query, search_in_title, search_in_content)
         
         if not conditions:
             return 0
@@ -150,19 +342,29 @@ class DocumentRepository:
         result = await self.session.execute(base_query)
         return result.scalar()
     
-    def _to_domain(self, db_document: DocumentModel) -> "Document":
-        """Преобразование модели БД в доменную сущность"""
+    def _search_conditions(self, query: str, search_in_title: bool, search_in_content: bool) -> list:
+        """Условия поиска, рассчитанные на GIN-индексы"""
+        conditions = []
+        ts_query = func.plainto_tsquery(_TS_CONFIG, query)
+        
+        if search_in_title:
+            # Полнотекстовый поиск по словам и подстрочный через триграммный индекс
+            conditions.append(func.to_tsvector(_TS_CONFIG, DocumentModel.title).op("@@")(ts_query))
+            conditions.append(DocumentModel.title.ilike(f"%{query}%"))
+        
+        if search_in_content:
+            # Подстрочный поиск сохраняет совпадения по части слова ("delt" -> "delta"),
+            # которые полнотекстовый поиск не находит
+            conditions.append(func.to_tsvector(_TS_CONFIG, DocumentModel.content).op("@@")(ts_query))
+            conditions.append(DocumentModel.content.ilike(f"%{query}%"))
+        
+        return conditions
+    
+    def _to_domain(self, row) -> "Document":
+        """Преобразование строки DOCUMENT_COLUMNS или модели БД в доменную сущность"""
         from app.domains.documents.entities import Document
         
-        return Document(
-            uuid=db_document.uuid,
-            title=db_document.title,
-            content=db_document.content,
-            version=db_document.version,
-            owner_id=db_document.owner_id,
-            created_at=db_document.created_at,
-            updated_at=db_document.updated_at
-        )
+        return Document.from_row(row)
 
 
 class DocumentVersionRepository:
@@ -173,18 +375,31 @@ class DocumentVersionRepository:
     
     async def create(self, version: "DocumentVersion") -> "DocumentVersion":
         """Создание новой версии документа"""
-        db_version = DocumentVersionModel(
+        from app.domains.documents.entities import DocumentVersion
+        
+        stmt = (
+            insert(DocumentVersionModel)
+            .values(
+                uuid=version.uuid,
+                document_id=version.document_id,
+                content=version.content,
+                version_number=version.version_number,
+                created_by=version.created_by
+            )
+            .returning(DocumentVersionModel.created_at, DocumentVersionModel.updated_at)
+        )
+        
+        row = (await self.session.execute(stmt)).one()
+        
+        return DocumentVersion(
             uuid=version.uuid,
             document_id=version.document_id,
             content=version.content,
             version_number=version.version_number,
-            created_by=version.created_by
+            created_by=version.created_by,
+            created_at=row.created_at,
+            updated_at=row.updated_at
         )
-        
-        self.session.add(db_version)
-        await self.session.commit()
-        await self.session.refresh(db_version)
-        return self._to_domain(db_version)
     
     async def get_by_uuid(self, version_uuid: uuid.UUID) -> Optional["DocumentVersion"]:
         """Получение версии по UUID"""
@@ -211,6 +426,21 @@ class DocumentVersionRepository:
         db_versions = result.scalars().all()
         return [self._to_domain(version) for version in db_versions]
     
+    async def stream_by_document(
+        self,
+        document_id: uuid.UUID,
+        chunk_size: int = 50
+    ) -> AsyncIterator["DocumentVersion"]:
+        """Потоковое чтение всех версий документа порциями по chunk_size строк"""
+        result = await self.session.stream(
+            select(DocumentVersionModel)
+            .where(DocumentVersionModel.document_id == document_id)
+            .order_by(DocumentVersionModel.version_number.desc())
+            .execution_options(yield_per=chunk_size)
+        )
+        async for db_version in result.scalars():
+            yield self._to_domain(db_version)
+    
     async def get_latest_version(self, document_id: uuid.UUID) -> Optional["DocumentVersion"]:
         """Получение последней версии документа"""
         result = await self.session.execute(
@@ -240,6 +470,52 @@ class DocumentVersionRepository:
         db_version = result.scalar_one_or_none()
         return self._to_domain(db_version) if db_version else None
     
+    async def get_versions_by_numbers(
+        self,
+        document_id: uuid.UUID,
+        version_numbers: List[int]
+    ) -> Dict[int, "DocumentVersion"]:
+        """Получение нескольких версий по номерам одним запросом"""
+        result = await self.session.execute(
+            select(DocumentVersionModel)
+            .where(
+                and_(
+                    DocumentVersionModel.document_id == document_id,
+                    DocumentVersionModel.version_number.in_(version_numbers)
+                )
+            )
+        )
+        return {
+            db_version.version_number: self._to_domain(db_version)
+            for db_version in result.scalars().all()
+        }
+    
+    async def get_version_with_document(
+        self,
+        document_id: uuid.UUID,
+        version_number: int
+    ) -> Optional[Tuple["DocumentVersion", "Document"]]:
+        """Получение версии вместе с документом одним запросом"""
+        from app.domains.documents.entities import Document
+        
+        result = await self.session.execute(
+            select(DocumentVersionModel, DocumentModel)
+            .options(_NO_LAZY_LOADS)
+            .join(DocumentModel, DocumentModel.uuid == DocumentVersionModel.document_id)
+            .where(
+                and_(
+                    DocumentVersionModel.document_id == document_id,
+                    DocumentVersionModel.version_number == version_number
+                )
+            )
+        )
+        row = result.one_or_none()
+        if not row:
+            return None
+        
+        db_version, db_document = row
+        return self._to_domain(db_version), Document.from_row(db_document)
+    
     async def count_by_document(self, document_id: uuid.UUID) -> int:
         """Подсчет количества версий документа"""
         result = await self.session.execute(
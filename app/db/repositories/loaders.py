@@ -0,0 +1,97 @@
+from typing import Optional, List, Dict, Callable, TYPE_CHECKING
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, bindparam, Row
+import asyncio
+import uuid
+
+from app.db.models.document import Document as DocumentModel
+
+if TYPE_CHECKING:
+    from app.domains.documents.entities import Document
+
+# Колонки, из которых собирается сущность Document. Выборка колонок, а не
+# модели, не создает ORM-объектов и не проходит через identity map сессии
+DOCUMENT_COLUMNS = (
+    DocumentModel.uuid,
+    DocumentModel.title,
+    DocumentModel.content,
+    DocumentModel.version,
+    DocumentModel.owner_id,
+    DocumentModel.created_at,
+    DocumentModel.updated_at,
+)
+
+_SELECT_BY_UUIDS = (
+    select(*DOCUMENT_COLUMNS)
+    .where(DocumentModel.uuid.in_(bindparam("doc_uuids", expanding=True)))
+)
+
+
+class DocumentLoader:
+    """Пакетная загрузка документов по UUID в рамках одной сессии (запроса)
+
+    Запросы, сделанные в одном проходе цикла событий, объединяются в один
+    SELECT ... WHERE uuid IN (...). Результаты кешируются до конца сессии.
+    """
+
+    _INFO_KEY = "document_loader"
+
+    def __init__(self, session: AsyncSession, to_domain: Callable[[Row], "Document"]):
+        self.session = session
+        self._to_domain = to_domain
+        self._futures: Dict[uuid.UUID, asyncio.Future] = {}
+        self._pending: List[uuid.UUID] = []
+
+    @classmethod
+    def for_session(
+        cls,
+        session: AsyncSession,
+        to_domain: Callable[[Row], "Document"]
+    ) -> "DocumentLoader":
+        """Загрузчик, привязанный к сессии: один на запрос"""
+        loader = session.info.get(cls._INFO_KEY)
+        if loader is None:
+            loader = cls(session, to_domain)
+            session.info[cls._INFO_KEY] = loader
+        return loader
+
+    async def load(self, document_uuid: uuid.UUID) -> Optional["Document"]:
+        """Получение документа; одновременные вызовы выполняются одним запросом"""
+        future = self._futures.get(document_uuid)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[document_uuid] = future
+            self._pending.append(document_uuid)
+            if len(self._pending) == 1:
+                loop.call_soon(self._schedule_dispatch)
+        return await asyncio.shield(future)
+
+    def clear(self, document_uuid: uuid.UUID) -> None:
+        """Сброс закешированного документа после его изменения"""
+        future = self._futures.get(document_uuid)
+        if future is not None and future.done():
+            del self._futures[document_uuid]
+
+    def _schedule_dispatch(self) -> None:
+        document_uuids, self._pending = self._pending, []
+        asyncio.ensure_future(self._dispatch(document_uuids))
+
+    async def _dispatch(self, document_uuids: List[uuid.UUID]) -> None:
+        """Выполнение накопленных запросов одним SELECT"""
+        try:
+            result = await self.session.execute(_SELECT_BY_UUIDS, {"doc_uuids": document_uuids})
+            rows = {row.uuid: row for row in result.all()}
+        except Exception as exc:
+            for document_uuid in document_uuids:
+                future = self._futures.pop(document_uuid, None)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            return
+
+        for document_uuid in document_uuids:
+            future = self._futures.get(document_uuid)
+            if future is None or future.done():
+                continue
+            row = rows.get(document_uuid)
+            future.set_result(self._to_domain(row) if row else None)
@@ -1,11 +1,30 @@
-from typing import Optional, List
+from typing import Optional, List, Tuple, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, or_, bindparam
 from sqlalchemy.exc import IntegrityError
+from datetime import datetime
 import uuid
 
 from app.db.models.user import User as UserModel
-from app.domains.identity.entities import User
+from app.domains.identity.entities import User, UserPublic
+
+# Колонки публичного представления пользователя (без password_hash)
+_PUBLIC_COLUMNS = (
+    UserModel.uuid,
+    UserModel.email,
+    UserModel.username,
+    UserModel.is_active,
+    UserModel.created_at,
+    UserModel.updated_at,
+)
+
+# Запросы поиска строятся один раз на модуль; значения передаются параметрами,
+# поэтому SQL компилируется один раз и берется из кеша движка
+_SELECT_BY_UUID = select(UserModel).where(UserModel.uuid == bindparam("user_uuid"))
+_SELECT_BY_EMAIL = select(UserModel).where(UserModel.email == bindparam("user_email"))
+_SELECT_PUBLIC_BY_UUID = select(*_PUBLIC_COLUMNS).where(UserModel.uuid == bindparam("user_uuid"))
+_SELECT_PUBLIC_BY_EMAIL = select(*_PUBLIC_COLUMNS).where(UserModel.email == bindparam("user_email"))
+_SELECT_PUBLIC_BY_USERNAME = select(*_PUBLIC_COLUMNS).where(UserModel.username == bindparam("user_username"))
 
 
 class UserRepository:
@@ -26,38 +45,44 @@ class UserRepository:
         
         self.session.add(db_user)
         try:
-            await self.session.commit()
-            await self.session.refresh(db_user)
-            return self._to_domain(db_user)
+            await self.session.flush()
         except IntegrityError:
-            await self.session.rollback()
             raise ValueError("User with this email or username already exists")
+        
+        await self.session.refresh(db_user)
+        return self._to_domain(db_user)
     
     async def get_by_uuid(self, user_uuid: uuid.UUID) -> Optional[User]:
         """Получение пользователя по UUID"""
-        result = await self.session.execute(
-            select(UserModel).where(UserModel.uuid == user_uuid)
-        )
+        result = await self.session.execute(_SELECT_BY_UUID, {"user_uuid": user_uuid})
         db_user = result.scalar_one_or_none()
         return self._to_domain(db_user) if db_user else None
     
-    async def get_by_email(self, email: str) -> Optional[User]:
-        """Получение пользователя по email"""
-        result = await self.session.execute(
-            select(UserModel).where(UserModel.email == email)
-        )
-        db_user = result.scalar_one_or_none()
-        return self._to_domain(db_user) if db_user else None
+    async def get_by_uuid_public(self, user_uuid: uuid.UUID) -> Optional[UserPublic]:
+        """Получение публичных данных пользователя по UUID"""
+        result = await self.session.execute(_SELECT_PUBLIC_BY_UUID, {"user_uuid": user_uuid})
+        row = result.one_or_none()
+        return self._to_public(row) if row else None
     
-    async def get_by_username(self, username: str) -> Optional[User]:
-        """Получение пользователя по username"""
-        result = await self.session.execute(
-            select(UserModel).where(UserModel.username == username)
-        )
+    async def get_by_email_with_hash(self, email: str) -> Optional[User]:
+        """Получение пользователя вместе с хешем пароля по email"""
+        result = await self.session.execute(_SELECT_BY_EMAIL, {"user_email": email})
         db_user = result.scalar_one_or_none()
         return self._to_domain(db_user) if db_user else None
     
-    async def update(self, user: User) -> User:
+    async def get_by_email(self, email: str) -> Optional[UserPublic]:
+        """Получение публичных данных пользователя по email"""
+        result = await self.session.execute(_SELECT_PUBLIC_BY_EMAIL, {"user_email": email})
+        row = result.one_or_none()
+        return self._to_public(row) if row else None
+    
+    async def get_by_username(self, username: str) -> Optional[UserPublic]:
+        """Получение публичных данных пользователя по username"""
+        result = await self.session.execute(_SELECT_PUBLIC_BY_USERNAME, {"user_username": username})
+        row = result.one_or_none()
+        return self._to_public(row) if row else None
+    
+    async def update(self, user: Union[User, UserPublic]) -> Optional[UserPublic]:
         """Обновление пользователя"""
         stmt = (
             update(UserModel)
@@ -71,38 +96,51 @@ class UserRepository:
         )
         
         await self.session.execute(stmt)
-        await self.session.commit()
         
-        return await self.get_by_uuid(user.uuid)
+        return await self.get_by_uuid_public(user.uuid)
+    
+    async def update_password(self, user_uuid: uuid.UUID, password_hash: str, updated_at: datetime) -> bool:
+        """Обновление хеша пароля пользователя"""
+        stmt = (
+            update(UserModel)
+            .where(UserModel.uuid == user_uuid)
+            .values(password_hash=password_hash, updated_at=updated_at)
+        )
+        
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
     
     async def delete(self, user_uuid: uuid.UUID) -> bool:
         """Удаление пользователя"""
         stmt = delete(UserModel).where(UserModel.uuid == user_uuid)
         result = await self.session.execute(stmt)
-        await self.session.commit()
         return result.rowcount > 0
     
-    async def get_all(self, limit: int = 100, offset: int = 0) -> List[User]:
+    async def get_all(self, limit: int = 100, offset: int = 0) -> List[UserPublic]:
         """Получение списка пользователей"""
         result = await self.session.execute(
-            select(UserModel).offset(offset).limit(limit)
+            select(*_PUBLIC_COLUMNS).offset(offset).limit(limit)
         )
-        db_users = result.scalars().all()
-        return [self._to_domain(user) for user in db_users]
+        return [self._to_public(row) for row in result]
     
-    async def email_exists(self, email: str) -> bool:
-        """Проверка существования email"""
-        result = await self.session.execute(
-            select(UserModel.uuid).where(UserModel.email == email)
-        )
-        return result.scalar_one_or_none() is not None
-    
-    async def username_exists(self, username: str) -> bool:
-        """Проверка существования username"""
+    async def conflicts(self, email: Optional[str], username: Optional[str]) -> Tuple[bool, bool]:
+        """Проверка занятости email и username одним запросом"""
+        conditions = []
+        if email:
+            conditions.append(UserModel.email == email)
+        if username:
+            conditions.append(UserModel.username == username)
+        
+        if not conditions:
+            return False, False
+        
         result = await self.session.execute(
-            select(UserModel.uuid).where(UserModel.username == username)
+            select(UserModel.email, UserModel.username).where(or_(*conditions))
         )
-        return result.scalar_one_or_none() is not None
+        rows = result.all()
+        email_taken = bool(email) and any(row.email == email for row in rows)
+        username_taken = bool(username) and any(row.username == username for row in rows)
+        return email_taken, username_taken
     
     def _to_domain(self, db_user: UserModel) -> User:
         """Преобразование модели БД в доменную сущность"""
@@ -116,6 +154,17 @@ class UserRepository:
             updated_at=db_user.updated_at
         )
     
+    def _to_public(self, row) -> UserPublic:
+        """Преобразование строки выборки в публичное представление"""
+        return UserPublic(
+            uuid=row.uuid,
+            email=row.email,
+            username=row.username,
+            is_active=row.is_active,
+            created_at=row.created_at,
+            updated_at=row.updated_at
+        )
+    
     def _to_model(self, user: User) -> UserModel:
         """Преобразование доменной сущности в модель БД"""
         return UserModel(
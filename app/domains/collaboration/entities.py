@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from enum import Enum
 import json
 
@@ -12,9 +12,56 @@ class OperationType(Enum):
     RETAIN = "retain"
 
 
+def _transform_span(
+    operation_type: OperationType,
+    position: int,
+    length: int,
+    other_type: OperationType,
+    other_position: int,
+    other_span: int
+) -> Tuple[int, int]:
+    """Трансформация позиции и длины операции относительно другой операции"""
+    if operation_type == OperationType.INSERT:
+        if other_type == OperationType.INSERT:
+            if position <= other_position:
+                return position, length
+            return position + other_span, length
+        elif other_type == OperationType.DELETE:
+            if position <= other_position:
+                return position, length
+            elif position > other_position + other_span:
+                return position - other_span, length
+            return other_position, length
+    
+    elif operation_type == OperationType.DELETE:
+        if other_type == OperationType.INSERT:
+            if position < other_position:
+                return position, length
+            return position + other_span, length
+        elif other_type == OperationType.DELETE:
+            if position + length <= other_position:
+                return position, length
+            elif position >= other_position + other_span:
+                return position - other_span, length
+            
+            # Пересекающиеся удаления
+            start = max(position, other_position)
+            end = min(position + length, other_position + other_span)
+            overlap = end - start
+            
+            if position < other_position:
+                return position, max(0, length - overlap)
+            return other_position, max(0, length - overlap)
+    
+    # Для RETAIN и других случаев
+    return position, length
+
+
 class Operation:
     """Операция в системе совместного редактирования"""
     
+    __slots__ = ("uuid", "operation_type", "position", "content", "length", "author_id", "timestamp", "version")
+    
     def __init__(
         self,
         operation_type: OperationType,
@@ -46,118 +93,25 @@ class Operation:
     
     def transform(self, other: "Operation") -> "Operation":
         """Трансформация операции относительно другой операции"""
-        if self.operation_type == OperationType.INSERT:
-            if other.operation_type == OperationType.INSERT:
-                if self.position <= other.position:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position,
-                        content=self.content,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-                else:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position + len(other.content),
-                        content=self.content,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-            elif other.operation_type == OperationType.DELETE:
-                if self.position <= other.position:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position,
-                        content=self.content,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-                elif self.position > other.position + other.length:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position - other.length,
-                        content=self.content,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-                else:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=other.position,
-                        content=self.content,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-        
-        elif self.operation_type == OperationType.DELETE:
-            if other.operation_type == OperationType.INSERT:
-                if self.position < other.position:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position,
-                        length=self.length,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-                elif self.position >= other.position:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position + len(other.content),
-                        length=self.length,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-            elif other.operation_type == OperationType.DELETE:
-                if self.position + self.length <= other.position:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position,
-                        length=self.length,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-                elif self.position >= other.position + other.length:
-                    return Operation(
-                        operation_type=self.operation_type,
-                        position=self.position - other.length,
-                        length=self.length,
-                        author_id=self.author_id,
-                        version=self.version
-                    )
-                else:
-                    # Пересекающиеся удаления
-                    start = max(self.position, other.position)
-                    end = min(self.position + self.length, other.position + other.length)
-                    overlap = end - start
-                    
-                    if self.position < other.position:
-                        return Operation(
-                            operation_type=self.operation_type,
-                            position=self.position,
-                            length=max(0, self.length - overlap),
-                            author_id=self.author_id,
-                            version=self.version
-                        )
-                    else:
-                        return Operation(
-                            operation_type=self.operation_type,
-                            position=other.position,
-                            length=max(0, self.length - overlap),
-                            author_id=self.author_id,
-                            version=self.version
-                        )
-        
-        # Для RETAIN и других случаев
+        position, length = _transform_span(
+            self.operation_type, self.position, self.length,
+            other.operation_type, other.position, other.span()
+        )
         return Operation(
             operation_type=self.operation_type,
-            position=self.position,
+            position=position,
             content=self.content,
-            length=self.length,
+            length=length,
             author_id=self.author_id,
             version=self.version
         )
     
+    def span(self) -> int:
+        """Длина фрагмента текста, затрагиваемого операцией"""
+        if self.operation_type == OperationType.INSERT:
+            return len(self.content)
+        return self.length
+    
     def to_dict(self) -> Dict[str, Any]:
         """Сериализация операции в словарь"""
         return {
@@ -191,6 +145,11 @@ class Operation:
 class DocumentSession:
     """Сессия совместного редактирования документа"""
     
+    __slots__ = (
+        "uuid", "document_id", "user_id", "cursor_position", "selection_start", "selection_end",
+        "joined_at", "last_activity", "is_active", "color"
+    )
+    
     def __init__(
         self,
         document_id: uuid.UUID,
@@ -288,6 +247,47 @@ class OperationHistory:
         
         return transformed
     
+    def transform_batch(self, operations: List[Operation]) -> List[Operation]:
+        """Трансформация пакета операций относительно истории и друг друга за один проход"""
+        concurrent_by_version: Dict[int, List[Tuple[OperationType, int, int]]] = {}
+        processed: List[Tuple[OperationType, int, int]] = []
+        transformed_operations = []
+        
+        for operation in operations:
+            concurrent = concurrent_by_version.get(operation.version)
+            if concurrent is None:
+                if operation.version >= self.current_version:
+                    concurrent = []
+                else:
+                    # Версии в истории идут подряд начиная с 1, поэтому
+                    # операции новее version - это просто хвост списка
+                    concurrent = [
+                        (op.operation_type, op.position, op.span())
+                        for op in self.operations[max(operation.version, 0):]
+                    ]
+                concurrent_by_version[operation.version] = concurrent
+            
+            operation_type = operation.operation_type
+            position, length = operation.position, operation.length
+            
+            for other in processed:
+                position, length = _transform_span(operation_type, position, length, *other)
+            for other in concurrent:
+                position, length = _transform_span(operation_type, position, length, *other)
+            
+            transformed = Operation(
+                operation_type=operation_type,
+                position=position,
+                content=operation.content,
+                length=length,
+                author_id=operation.author_id,
+                version=operation.version
+            )
+            processed.append((operation_type, position, transformed.span()))
+            transformed_operations.append(transformed)
+        
+        return transformed_operations
+    
     def apply_operation_to_text(self, text: str, operation: Operation) -> str:
         """Применение операции к тексту"""
         return operation.apply_to(text)
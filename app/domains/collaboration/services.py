@@ -2,8 +2,11 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 import asyncio
+import logging
 from datetime import datetime, timedelta
 
+import orjson
+
 from app.db.repositories.collaboration_repository import (
     DocumentSessionRepository, OperationRepository, UserCursorRepository
 )
@@ -15,6 +18,8 @@ from app.domains.collaboration.schemas import (
     DocumentSyncRequest, OperationBatch
 )
 
+logger = logging.getLogger(__name__)
+
 
 class CollaborationService:
     """Сервис для управления совместным редактированием"""
@@ -39,12 +44,14 @@ class CollaborationService:
             # Обновляем существующую сессию
             existing_session.update_activity()
             await self.session_repository.update(existing_session)
+            await self.session.commit()
             self._active_sessions[existing_session.uuid] = existing_session
             return existing_session
         
         # Создаем новую сессию
         session = DocumentSession(document_id=document_id, user_id=user_id)
         created_session = await self.session_repository.create(session)
+        await self.session.commit()
         self._active_sessions[created_session.uuid] = created_session
         
         # Инициализируем историю операций, если нужно
@@ -71,6 +78,7 @@ class CollaborationService:
         
         # Удаляем курсор
         await self.cursor_repository.remove_cursor(document_id, user_id)
+        await self.session.commit()
         
         return True
     
@@ -95,14 +103,19 @@ class CollaborationService:
             version=operation_data.version
         )
         
-        # Трансформируем операцию относительно существующих
-        transformed_operation = history.transform_operation(operation)
+        # Трансформируем операцию относительно существующих. Если клиент
+        # уже видел текущую версию, конкурентных операций нет
+        if operation.version >= history.current_version:
+            transformed_operation = operation
+        else:
+            transformed_operation = history.transform_operation(operation)
         
         # Добавляем в историю
         history.add_operation(transformed_operation)
         
         # Сохраняем в БД
         await self.operation_repository.create(transformed_operation)
+        await self.session.commit()
         
         # Рассылаем операцию другим пользователям
         await self._broadcast_operation(document_id, transformed_operation)
@@ -138,6 +151,7 @@ class CollaborationService:
             selection_end=selection_end,
             color=session.color if session else "#FF0000"
         )
+        await self.session.commit()
         
         # Рассылаем обновление курсора другим пользователям
         await self._broadcast_cursor_update(document_id, user_id, position, selection_start, selection_end)
@@ -195,39 +209,43 @@ class CollaborationService:
         
         history = self._operation_histories[document_id]
         
-        # Применяем операции по порядку
-        for i, op_data in enumerate(batch.operations):
-            try:
-                operation = Operation(
-                    operation_type=op_data.type,
-                    position=op_data.position,
-                    content=op_data.content,
-                    length=op_data.length,
-                    author_id=op_data.author_id,
-                    version=op_data.version
-                )
-                
-                # Трансформируем относительно предыдущих операций в пакете
-                for prev_op in processed_operations:
-                    operation = operation.transform(prev_op)
-                
-                # Трансформируем относительно существующих операций
-                transformed_operation = history.transform_operation(operation)
-                
-                # Добавляем в историю
+        operations = [
+            Operation(
+                operation_type=op_data.type,
+                position=op_data.position,
+                content=op_data.content,
+                length=op_data.length,
+                author_id=op_data.author_id,
+                version=op_data.version
+            )
+            for op_data in batch.operations
+        ]
+        
+        # Трансформируем весь пакет относительно истории и предыдущих операций пакета
+        transformed_operations = history.transform_batch(operations)
+        
+        # Версии назначаются до записи, а в историю операции попадают только
+        # после commit: несохраненные операции не участвуют в трансформации
+        for offset, transformed_operation in enumerate(transformed_operations, start=1):
+            transformed_operation.version = history.current_version + offset
+        
+        # Сохраняем весь пакет в БД одним запросом
+        try:
+            await self.operation_repository.append_operations(document_id, transformed_operations)
+            await self.session.commit()
+            for transformed_operation in transformed_operations:
                 history.add_operation(transformed_operation)
-                
-                # Сохраняем в БД
-                await self.operation_repository.create(transformed_operation)
-                
-                processed_operations.append(transformed_operation)
-                
-            except Exception as e:
-                failed_operations.append({
+            processed_operations = transformed_operations
+        except Exception as e:
+            await self.session.rollback()
+            failed_operations = [
+                {
                     "operation_index": i,
                     "operation_data": op_data.dict(),
                     "error": str(e)
-                })
+                }
+                for i, op_data in enumerate(batch.operations)
+            ]
         
         # Рассылаем операции другим пользователям
         for operation in processed_operations:
@@ -273,21 +291,21 @@ class CollaborationService:
     
     async def cleanup_inactive_sessions(self) -> int:
         """Очистка неактивных сессий"""
-        # Очистка в БД
-        db_cleaned = await self.session_repository.cleanup_inactive_sessions(minutes=30)
-        
-        # Очистка в памяти
-        current_time = datetime.utcnow()
+        # Очистка в памяти: граница неактивности вычисляется один раз
+        cutoff_time = datetime.utcnow() - timedelta(minutes=30)
         inactive_sessions = [
-            uuid for uuid, session in self._active_sessions.items()
-            if current_time - session.last_activity > timedelta(minutes=30)
+            session_uuid for session_uuid, session in self._active_sessions.items()
+            if session.last_activity < cutoff_time
         ]
         
         for session_uuid in inactive_sessions:
-            del self._active_sessions[session_uuid]
+            self._active_sessions.pop(session_uuid, None)
         
-        # Очистка старых курсоров
+        # Очистка в БД. Запросы выполняются последовательно: AsyncSession
+        # не допускает конкурентных операций на одном соединении
+        db_cleaned = await self.session_repository.cleanup_inactive_sessions(minutes=30)
         cursor_cleaned = await self.cursor_repository.cleanup_old_cursors(minutes=10)
+        await self.session.commit()
         
         return db_cleaned + len(inactive_sessions) + cursor_cleaned
     
@@ -303,9 +321,31 @@ class CollaborationService:
     
     async def _broadcast_operation(self, document_id: uuid.UUID, operation: Operation) -> None:
         """Рассылка операции другим пользователям"""
-        # Здесь будет интеграция с WebSocket
-        # Временно просто логируем
-        print(f"Broadcasting operation {operation} to document {document_id}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Broadcasting operation %s to document %s", operation.uuid, document_id)
+        
+        connections = self._websocket_connections.get(document_id)
+        if not connections:
+            return
+        
+        # Сообщение сериализуется один раз для всех получателей
+        payload = orjson.dumps({
+            "type": "operation",
+            "data": {
+                "uuid": operation.uuid,
+                "type": operation.operation_type.value,
+                "position": operation.position,
+                "content": operation.content,
+                "length": operation.length,
+                "author_id": operation.author_id,
+                "timestamp": operation.timestamp,
+                "version": operation.version
+            }
+        }, option=orjson.OPT_NAIVE_UTC).decode()
+        await asyncio.gather(
+            *(websocket.send_text(payload) for websocket in connections),
+            return_exceptions=True
+        )
     
     async def _broadcast_cursor_update(
         self, 
@@ -316,9 +356,29 @@ class CollaborationService:
         selection_end: int
     ) -> None:
         """Рассылка обновления курсора другим пользователям"""
-        # Здесь будет интеграция с WebSocket
-        # Временно просто логируем
-        print(f"Broadcasting cursor update for user {user_id} in document {document_id}: pos={position}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Broadcasting cursor update for user %s in document %s: pos=%s",
+                user_id, document_id, position
+            )
+        
+        connections = self._websocket_connections.get(document_id)
+        if not connections:
+            return
+        
+        payload = orjson.dumps({
+            "type": "cursor",
+            "data": {
+                "user_id": user_id,
+                "position": position,
+                "selection_start": selection_start,
+                "selection_end": selection_end
+            }
+        }).decode()
+        await asyncio.gather(
+            *(websocket.send_text(payload) for websocket in connections),
+            return_exceptions=True
+        )
 
 
 class OperationalTransformationService:
@@ -4,8 +4,7 @@ from app.domains.documents.schemas import (
     DocumentListResponse, DocumentVersionBase, DocumentVersionResponse,
     DocumentVersionCreate, DocumentDiffResponse, DocumentAccessResponse,
     DocumentShareRequest, DocumentShareResponse, DocumentSearchRequest,
-    DocumentSearchResponse, DocumentStatsResponse, DocumentExportRequest,
-    DocumentExportResponse
+    DocumentSearchResponse, DocumentStatsResponse, DocumentExportRequest
 )
 from app.domains.documents.services import DocumentService, DocumentVersionService
 
@@ -16,6 +15,5 @@ __all__ = [
     "DocumentVersionCreate", "DocumentDiffResponse", "DocumentAccessResponse",
     "DocumentShareRequest", "DocumentShareResponse", "DocumentSearchRequest",
     "DocumentSearchResponse", "DocumentStatsResponse", "DocumentExportRequest",
-    "DocumentExportResponse",
     "DocumentService", "DocumentVersionService"
 ]
\ No newline at end of file
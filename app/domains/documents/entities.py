@@ -1,11 +1,19 @@
+import difflib
 import uuid
 from datetime import datetime
 from typing import Optional, List
 
+_NO_COLLABORATORS: frozenset = frozenset()
+
 
 class Document:
     """Сущность документа домена Documents"""
     
+    __slots__ = (
+        "uuid", "title", "content", "version", "owner_id", "created_at", "updated_at",
+        "_word_count"
+    )
+    
     def __init__(
         self,
         uuid: uuid.UUID,
@@ -23,11 +31,13 @@ class Document:
         self.owner_id = owner_id
         self.created_at = created_at or datetime.utcnow()
         self.updated_at = updated_at or datetime.utcnow()
+        self._word_count = None
     
     def update_content(self, new_content: str) -> "DocumentVersion":
         """Обновление содержимого документа и создание новой версии"""
         old_content = self.content
         self.content = new_content
+        self._word_count = None
         self.version += 1
         self.updated_at = datetime.utcnow()
         
@@ -48,10 +58,10 @@ class Document:
         return len(self.content)
     
     def get_word_count(self) -> int:
-        """Подсчет количества слов в документе"""
-        if not self.content.strip():
-            return 0
-        return len(self.content.split())
+        """Подсчет количества слов в документе; результат кешируется до изменения содержимого"""
+        if self._word_count is None:
+            self._word_count = len(self.content.split()) if self.content else 0
+        return self._word_count
     
     @classmethod
     def create_document(cls, title: str, owner_id: uuid.UUID, content: str = "") -> "Document":
@@ -64,11 +74,28 @@ class Document:
             owner_id=owner_id
         )
     
+    @classmethod
+    def from_row(cls, row) -> "Document":
+        """Сборка документа из строки БД в обход __init__: все поля уже заполнены"""
+        document = cls.__new__(cls)
+        document.uuid = row.uuid
+        document.title = row.title
+        document.content = row.content
+        document.version = row.version
+        document.owner_id = row.owner_id
+        document.created_at = row.created_at
+        document.updated_at = row.updated_at
+        document._word_count = None
+        return document
+    
     def __eq__(self, other) -> bool:
         if not isinstance(other, Document):
             return False
         return self.uuid == other.uuid
     
+    def __hash__(self) -> int:
+        return hash(self.uuid)
+    
     def __repr__(self) -> str:
         return f"Document(uuid={self.uuid}, title={self.title}, version={self.version})"
 
@@ -76,6 +103,8 @@ class Document:
 class DocumentVersion:
     """Сущность версии документа"""
     
+    __slots__ = ("uuid", "document_id", "content", "version_number", "created_by", "created_at", "updated_at")
+    
     def __init__(
         self,
         uuid: uuid.UUID,
@@ -95,28 +124,16 @@ class DocumentVersion:
         self.updated_at = updated_at or datetime.utcnow()
     
     def get_diff(self, other_content: str) -> str:
-        """Получение разницы между версиями (упрощенная реализация)"""
-        # В реальном приложении здесь можно использовать difflib
+        """Получение разницы между версиями в формате unified diff"""
         if self.content == other_content:
             return "No changes"
         
-        lines1 = self.content.splitlines()
-        lines2 = other_content.splitlines()
-        
-        diff_lines = []
-        for i, (line1, line2) in enumerate(zip(lines1, lines2)):
-            if line1 != line2:
-                diff_lines.append(f"Line {i+1}: '{line1}' -> '{line2}'")
-        
-        # Обработка разной длины
-        if len(lines1) > len(lines2):
-            for i in range(len(lines2), len(lines1)):
-                diff_lines.append(f"Line {i+1}: REMOVED '{lines1[i]}'")
-        elif len(lines2) > len(lines1):
-            for i in range(len(lines1), len(lines2)):
-                diff_lines.append(f"Line {i+1}: ADDED '{lines2[i]}'")
-        
-        return "\n".join(diff_lines) if diff_lines else "Content changed"
+        diff_lines = difflib.unified_diff(
+            self.content.splitlines(),
+            other_content.splitlines(),
+            lineterm=""
+        )
+        return "\n".join(diff_lines) or "Content changed"
     
     @classmethod
     def create_version(
@@ -140,6 +157,9 @@ class DocumentVersion:
             return False
         return self.uuid == other.uuid
     
+    def __hash__(self) -> int:
+        return hash(self.uuid)
+    
     def __repr__(self) -> str:
         return f"DocumentVersion(uuid={self.uuid}, document_id={self.document_id}, version={self.version_number})"
 
@@ -147,18 +167,25 @@ class DocumentVersion:
 class DocumentAccess:
     """Сущность для управления доступом к документу"""
     
+    __slots__ = ("document_id", "owner_id", "_collaborators")
+    
     def __init__(self, document_id: uuid.UUID, owner_id: uuid.UUID):
         self.document_id = document_id
         self.owner_id = owner_id
-        self._collaborators = set()
+        # Множество соавторов создается только при первом добавлении:
+        # для обычной проверки прав хватает общего пустого множества
+        self._collaborators = _NO_COLLABORATORS
     
     def add_collaborator(self, user_id: uuid.UUID) -> None:
         """Добавление соавтора"""
+        if self._collaborators is _NO_COLLABORATORS:
+            self._collaborators = set()
         self._collaborators.add(user_id)
     
     def remove_collaborator(self, user_id: uuid.UUID) -> None:
         """Удаление соавтора"""
-        self._collaborators.discard(user_id)
+        if self._collaborators is not _NO_COLLABORATORS:
+            self._collaborators.discard(user_id)
     
     def can_access(self, user_id: uuid.UUID) -> bool:
         """Проверка доступа пользователя к документу"""
@@ -166,7 +193,8 @@ class DocumentAccess:
     
     def can_edit(self, user_id: uuid.UUID) -> bool:
         """Проверка прав на редактирование"""
-        return self.can_access(user_id)  # Упрощенно - все кто имеет доступ могут редактировать
+        # Упрощенно - все кто имеет доступ могут редактировать
+        return user_id == self.owner_id or user_id in self._collaborators
     
     def is_owner(self, user_id: uuid.UUID) -> bool:
         """Проверка является ли пользователь владельцем"""
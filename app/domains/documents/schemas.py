@@ -150,12 +150,3 @@ class DocumentExportRequest(BaseModel):
     """Схема для запроса на экспорт документа"""
     format: str = Field(..., pattern="^(txt|md|html|pdf)$")
     include_versions: bool = False
-
-
-class DocumentExportResponse(BaseModel):
-    """Схема для ответа с экспортированным документом"""
-    document_id: uuid.UUID
-    format: str
-    filename: str
-    content: str
-    exported_at: datetime
\ No newline at end of file
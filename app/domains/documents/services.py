@@ -1,25 +1,114 @@
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple, AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 from datetime import datetime
+import asyncio
+import hashlib
+import html
 import time
 
-from app.db.repositories.document_repository import DocumentRepository, DocumentVersionRepository
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.cache import redis_client
+from app.core.db import SessionLocal
+from app.db.repositories.document_repository import (
+    DocumentRepository, DocumentVersionRepository, document_cache_key
+)
 from app.domains.documents.entities import Document, DocumentVersion, DocumentAccess
 from app.domains.documents.schemas import (
     DocumentCreate, DocumentUpdate, DocumentSearchRequest,
     DocumentVersionCreate
 )
 
+# Время жизни закешированных данных доступа к документу, в секундах
+ACCESS_CACHE_TTL = 60
+
+# Разница между двумя текстами не меняется, поэтому хранится сутки
+DIFF_CACHE_TTL = 86400
+
+# Результаты поиска допускают небольшое устаревание
+SEARCH_CACHE_TTL = 30
+
+EXPORT_MEDIA_TYPES = {
+    "txt": "text/plain; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "pdf": "text/plain; charset=utf-8",
+}
+
+# HTML отдается частями: начало с заголовком, содержимое и история версий
+# внутри <body>, затем закрывающие теги. Заголовок и тексты подставляются
+# уже экранированными через html.escape
+_HTML_HEAD_TPL = (
+    b'<!DOCTYPE html><html><head><meta charset="utf-8"><title>%s</title></head>'
+    b'<body><h1>%s</h1>'
+)
+_HTML_TAIL = b'</body></html>'
+
+
+def _access_cache_key(document_uuid: uuid.UUID) -> str:
+    return f"doc:{document_uuid}"
+
+
+async def invalidate_document_cache(redis: Optional[Redis], document_uuid: uuid.UUID) -> None:
+    """Сброс закешированного документа и данных доступа к нему
+
+    Вызывается после фиксации транзакции, изменившей документ.
+    """
+    if redis is None:
+        return
+    try:
+        await redis.delete(document_cache_key(document_uuid), _access_cache_key(document_uuid))
+    except RedisError:
+        pass
+
 
 class DocumentService:
     """Сервис для работы с документами"""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, redis: Optional[Redis] = None):
         self.session = session
-        self.document_repository = DocumentRepository(session)
+        self.redis = redis if redis is not None else redis_client
+        self.document_repository = DocumentRepository(session, self.redis)
         self.version_repository = DocumentVersionRepository(session)
     
+    async def _cache_access_info(self, document_uuid: uuid.UUID, access_info: dict) -> None:
+        """Сохранение владельца и времени изменения документа в кеш"""
+        if self.redis is None:
+            return
+        payload = orjson.dumps({
+            "owner_id": access_info["owner_id"],
+            "updated_at": access_info["updated_at"]
+        })
+        try:
+            await self.redis.set(_access_cache_key(document_uuid), payload, ex=ACCESS_CACHE_TTL)
+        except RedisError:
+            pass
+    
+    async def _get_access_info(self, document_uuid: uuid.UUID) -> Optional[dict]:
+        """Данные для проверки доступа: сначала из кеша, при промахе из БД"""
+        if self.redis is not None:
+            try:
+                cached = await self.redis.get(_access_cache_key(document_uuid))
+            except RedisError:
+                cached = None
+            if cached is not None:
+                data = orjson.loads(cached)
+                # orjson пишет время в ISO 8601: возвращаем тот же тип, что и чтение из БД
+                return {
+                    "owner_id": uuid.UUID(data["owner_id"]),
+                    "updated_at": datetime.fromisoformat(data["updated_at"])
+                }
+        
+        access_info = await self.document_repository.get_access_info(document_uuid)
+        if not access_info:
+            return None
+        
+        await self._cache_access_info(document_uuid, access_info)
+        return access_info
+    
     async def create_document(self, document_data: DocumentCreate, owner_id: uuid.UUID) -> Document:
         """Создание нового документа"""
         document = Document.create_document(
@@ -38,12 +127,21 @@ class DocumentService:
             created_by=owner_id
         )
         await self.version_repository.create(initial_version)
+        await self.session.commit()
         
         return created_document
     
     async def get_document(self, document_uuid: uuid.UUID) -> Optional[Document]:
         """Получение документа по UUID"""
-        return await self.document_repository.get_by_uuid(document_uuid)
+        document = await self.document_repository.get_by_uuid(document_uuid)
+        
+        if document:
+            await self._cache_access_info(
+                document.uuid,
+                {"owner_id": document.owner_id, "updated_at": document.updated_at}
+            )
+        
+        return document
     
     async def update_document(
         self, 
@@ -52,7 +150,7 @@ class DocumentService:
         user_id: uuid.UUID
     ) -> Optional[Document]:
         """Обновление документа"""
-        document = await self.document_repository.get_by_uuid(document_uuid)
+        document = await self.document_repository.get_by_uuid(document_uuid, use_cache=False)
         
         if not document:
             return None
@@ -62,6 +160,8 @@ class DocumentService:
         if not access.can_edit(user_id):
             raise PermissionError("You don't have permission to edit this document")
         
+        base_version = document.version
+        
         # Обновление заголовка
         if update_data.title:
             document.update_title(update_data.title)
@@ -71,20 +171,93 @@ class DocumentService:
             new_version = document.update_content(update_data.content)
             await self.version_repository.create(new_version)
         
-        return await self.document_repository.update(document)
+        updated_document = await self.document_repository.update(document, expected_version=base_version)
+        if updated_document is None:
+            raise ValueError("Document was modified concurrently")
+        await self.session.commit()
+        
+        await invalidate_document_cache(self.redis, document_uuid)
+        return updated_document
+    
+    async def apply_snapshots(
+        self,
+        snapshots: Dict[uuid.UUID, Tuple[uuid.UUID, str, datetime]]
+    ) -> List[uuid.UUID]:
+        """Запись снимков содержимого, пришедших по WebSocket, без создания версий
+
+        snapshots - {UUID документа: (автор, содержимое, время снимка)}. Снимки
+        автора без права редактирования отбрасываются; остальные записываются
+        одним UPDATE, который пропускает документы, измененные после снимка.
+        Возвращает UUID документов, к которым снимки применены.
+        """
+        owners = await self.document_repository.get_owners(list(snapshots))
+        contents = []
+        for document_uuid, (user_id, content, captured_at) in snapshots.items():
+            owner_id = owners.get(document_uuid)
+            if owner_id is None or not DocumentAccess(document_uuid, owner_id).can_edit(user_id):
+                continue
+            contents.append((document_uuid, content, captured_at))
+        
+        applied = await self.document_repository.update_contents(contents)
+        await self.session.commit()
+        
+        for document_uuid in applied:
+            await invalidate_document_cache(self.redis, document_uuid)
+        return applied
+    
+    async def create_snapshot_version(
+        self,
+        document_uuid: uuid.UUID,
+        user_id: uuid.UUID
+    ) -> Optional[DocumentVersion]:
+        """Версия для содержимого, записанного снимками
+
+        Создается, когда правки по WebSocket затихли. Если содержимое совпадает
+        с последней версией, новая версия не создается.
+        """
+        document = await self.document_repository.get_by_uuid(document_uuid, use_cache=False)
+        
+        if not document:
+            return None
+        
+        access = DocumentAccess(document_uuid, document.owner_id)
+        if not access.can_edit(user_id):
+            raise PermissionError("You don't have permission to edit this document")
+        
+        latest_version = await self.version_repository.get_latest_version(document_uuid)
+        if latest_version is not None and latest_version.content == document.content:
+            return None
+        
+        base_version = document.version
+        updated_at = document.updated_at
+        new_version = document.update_content(document.content)
+        # Содержимое не меняется: время изменения остается временем последнего снимка
+        document.updated_at = updated_at
+        created_version = await self.version_repository.create(new_version)
+        
+        if await self.document_repository.update(document, expected_version=base_version) is None:
+            raise ValueError("Document was modified concurrently")
+        await self.session.commit()
+        
+        await invalidate_document_cache(self.redis, document_uuid)
+        return created_version
     
     async def delete_document(self, document_uuid: uuid.UUID, user_id: uuid.UUID) -> bool:
         """Удаление документа"""
-        document = await self.document_repository.get_by_uuid(document_uuid)
+        access_info = await self.document_repository.get_access_info(document_uuid)
         
-        if not document:
+        if not access_info:
             return False
         
         # Только владелец может удалить документ
-        if document.owner_id != user_id:
+        if access_info["owner_id"] != user_id:
             raise PermissionError("Only the owner can delete this document")
         
-        return await self.document_repository.delete(document_uuid)
+        deleted = await self.document_repository.delete(document_uuid)
+        await self.session.commit()
+        
+        await invalidate_document_cache(self.redis, document_uuid)
+        return deleted
     
     async def get_user_documents(
         self, 
@@ -101,10 +274,35 @@ class DocumentService:
         user_id: Optional[uuid.UUID] = None,
         limit: int = 100,
         offset: int = 0
-    ) -> List[Document]:
-        """Поиск документов"""
+    ) -> Tuple[List[Document], int, int]:
+        """Поиск документов: страница результатов, общее число найденных и время поиска в мс"""
         start_time = time.time()
         
+        cache_key = None
+        if self.redis is not None:
+            # В кеше хранятся UUID найденных документов и их общее число,
+            # поэтому попадание в кеш не выполняет поисковых запросов
+            cache_key = "search:" + hashlib.blake2b(orjson.dumps([
+                search_request.query,
+                user_id.hex if user_id else None,
+                search_request.search_in_title,
+                search_request.search_in_content,
+                limit,
+                offset
+            ])).hexdigest()
+            try:
+                cached = await self.redis.get(cache_key)
+            except RedisError:
+                cached = None
+            if cached is not None:
+                data = orjson.loads(cached)
+                # Записи старого формата (только список UUID) считаются промахом
+                if isinstance(data, dict):
+                    document_uuids = [uuid.UUID(value) for value in data["uuids"]]
+                    documents = await self.document_repository.get_by_uuids(document_uuids)
+                    search_time = int((time.time() - start_time) * 1000)
+                    return documents, data["total_found"], search_time
+        
         documents = await self.document_repository.search(
             query=search_request.query,
             owner_id=user_id,
@@ -113,30 +311,33 @@ class DocumentService:
             limit=limit,
             offset=offset
         )
+        total_found = await self.document_repository.count_search_results(
+            search_request.query,
+            user_id,
+            search_request.search_in_title,
+            search_request.search_in_content
+        )
+        
+        if cache_key is not None:
+            try:
+                await self.redis.set(
+                    cache_key,
+                    orjson.dumps({
+                        "uuids": [document.uuid for document in documents],
+                        "total_found": total_found
+                    }),
+                    ex=SEARCH_CACHE_TTL
+                )
+            except RedisError:
+                pass
         
         search_time = int((time.time() - start_time) * 1000)  # в миллисекундах
         
-        return documents, search_time
+        return documents, total_found, search_time
     
     async def get_document_stats(self, document_uuid: uuid.UUID) -> Optional[dict]:
         """Получение статистики документа"""
-        document = await self.document_repository.get_by_uuid(document_uuid)
-        
-        if not document:
-            return None
-        
-        version_count = await self.version_repository.count_by_document(document_uuid)
-        
-        return {
-            "document_id": document.uuid,
-            "title": document.title,
-            "word_count": document.get_word_count(),
-            "character_count": document.get_content_length(),
-            "paragraph_count": len([p for p in document.content.split('\n') if p.strip()]),
-            "version_count": version_count,
-            "last_modified": document.updated_at,
-            "created_at": document.created_at
-        }
+        return await self.document_repository.get_stats(document_uuid)
     
     async def check_document_access(
         self, 
@@ -144,12 +345,12 @@ class DocumentService:
         user_id: uuid.UUID
     ) -> dict:
         """Проверка доступа к документу"""
-        document = await self.document_repository.get_by_uuid(document_uuid)
+        access_info = await self._get_access_info(document_uuid)
         
-        if not document:
+        if not access_info:
             return {"can_access": False, "can_edit": False, "is_owner": False}
         
-        access = DocumentAccess(document_uuid, document.owner_id)
+        access = DocumentAccess(document_uuid, access_info["owner_id"])
         
         return {
             "can_access": access.can_access(user_id),
@@ -162,64 +363,77 @@ class DocumentService:
         document_uuid: uuid.UUID, 
         format_type: str,
         include_versions: bool = False
-    ) -> Optional[dict]:
-        """Экспорт документа в различных форматах"""
+    ) -> Optional[Tuple[str, str, AsyncIterator[bytes]]]:
+        """Экспорт документа в различных форматах: имя файла, MIME-тип и поток байтов"""
         document = await self.document_repository.get_by_uuid(document_uuid)
         
         if not document:
             return None
         
-        content = document.content
-        filename = f"{document.title}.{format_type}"
+        media_type = EXPORT_MEDIA_TYPES.get(format_type)
+        if media_type is None:
+            raise ValueError(f"Unsupported format: {format_type}")
+        
+        if format_type == "pdf":
+            # Упрощенная реализация - в реальном приложении использовать библиотеку для PDF
+            filename = f"{document.title}.txt"
+        else:
+            filename = f"{document.title}.{format_type}"
+        
+        return filename, media_type, self._export_chunks(document, format_type, include_versions)
+    
+    async def _export_chunks(
+        self,
+        document: Document,
+        format_type: str,
+        include_versions: bool
+    ) -> AsyncIterator[bytes]:
+        """Поток экспортируемого содержимого без сборки всего текста в памяти"""
+        title = document.title
         
         if format_type == "txt":
-            exported_content = content
+            yield document.content.encode()
         elif format_type == "md":
-            exported_content = f"# {document.title}\n\n{content}"
+            yield f"# {title}\n\n".encode()
+            yield document.content.encode()
         elif format_type == "html":
-            exported_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>{document.title}</title>
-            </head>
-            <body>
-                <h1>{document.title}</h1>
-                <pre>{content}</pre>
-            </body>
-            </html>
-            """
+            title_bytes = html.escape(title).encode()
+            yield _HTML_HEAD_TPL % (title_bytes, title_bytes)
+            yield b"<pre>" + html.escape(document.content).encode() + b"</pre>"
         elif format_type == "pdf":
-            # Упрощенная реализация - в реальном приложении использовать библиотеку для PDF
-            exported_content = f"PDF export not implemented yet. Title: {document.title}\n\n{content}"
-            filename = f"{document.title}.txt"
-        else:
-            raise ValueError(f"Unsupported format: {format_type}")
+            yield f"PDF export not implemented yet. Title: {title}\n\n".encode()
+            yield document.content.encode()
         
         if include_versions:
-            versions = await self.version_repository.get_by_document(document_uuid)
-            version_info = "\n\n".join([
-                f"--- Version {v.version_number} ({v.created_at}) ---\n{v.content}"
-                for v in versions
-            ])
-            exported_content += f"\n\n=== VERSION HISTORY ===\n{version_info}"
-        
-        return {
-            "document_id": document.uuid,
-            "format": format_type,
-            "filename": filename,
-            "content": exported_content,
-            "exported_at": datetime.utcnow()
-        }
+            if format_type == "html":
+                yield b"<pre>"
+            yield b"\n\n=== VERSION HISTORY ===\n"
+            # Ответ отдается уже после выхода из обработчика, поэтому
+            # версии читаются в собственной сессии, а не в сессии запроса
+            async with SessionLocal() as session:
+                separator = b""
+                async for version in DocumentVersionRepository(session).stream_by_document(document.uuid):
+                    yield separator + f"--- Version {version.version_number} ({version.created_at}) ---\n".encode()
+                    if format_type == "html":
+                        yield html.escape(version.content).encode()
+                    else:
+                        yield version.content.encode()
+                    separator = b"\n\n"
+            if format_type == "html":
+                yield b"</pre>"
+        
+        if format_type == "html":
+            yield _HTML_TAIL
 
 
 class DocumentVersionService:
     """Сервис для работы с версиями документов"""
     
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, redis: Optional[Redis] = None):
         self.session = session
+        self.redis = redis if redis is not None else redis_client
         self.version_repository = DocumentVersionRepository(session)
-        self.document_repository = DocumentRepository(session)
+        self.document_repository = DocumentRepository(session, self.redis)
     
     async def get_document_versions(
         self, 
@@ -249,13 +463,41 @@ class DocumentVersionService:
         to_version: int
     ) -> Optional[str]:
         """Сравнение двух версий документа"""
-        from_doc = await self.version_repository.get_version_by_number(document_uuid, from_version)
-        to_doc = await self.version_repository.get_version_by_number(document_uuid, to_version)
+        versions = await self.version_repository.get_versions_by_numbers(
+            document_uuid, [from_version, to_version]
+        )
+        from_doc = versions.get(from_version)
+        to_doc = versions.get(to_version)
         
         if not from_doc or not to_doc:
             return None
         
-        return from_doc.get_diff(to_doc.content)
+        if self.redis is None:
+            return await asyncio.to_thread(from_doc.get_diff, to_doc.content)
+        
+        # Ключ зависит только от содержимого пары версий
+        digest = hashlib.blake2b(
+            from_doc.content.encode() + b"\0" + to_doc.content.encode(),
+            digest_size=16
+        ).hexdigest()
+        cache_key = f"diff:{digest}"
+        
+        try:
+            cached = await self.redis.get(cache_key)
+        except RedisError:
+            cached = None
+        if cached is not None:
+            return cached.decode()
+        
+        # difflib работает на чистом Python и не должен блокировать цикл событий
+        diff = await asyncio.to_thread(from_doc.get_diff, to_doc.content)
+        
+        try:
+            await self.redis.set(cache_key, diff.encode(), ex=DIFF_CACHE_TTL)
+        except RedisError:
+            pass
+        
+        return diff
     
     async def restore_version(
         self, 
@@ -264,15 +506,12 @@ class DocumentVersionService:
         user_id: uuid.UUID
     ) -> Optional[Document]:
         """Восстановление документа из версии"""
-        version = await self.version_repository.get_version_by_number(document_uuid, version_number)
+        found = await self.version_repository.get_version_with_document(document_uuid, version_number)
         
-        if not version:
+        if not found:
             return None
         
-        document = await self.document_repository.get_by_uuid(document_uuid)
-        
-        if not document:
-            return None
+        version, document = found
         
         # Проверка прав доступа
         access = DocumentAccess(document_uuid, document.owner_id)
@@ -280,7 +519,14 @@ class DocumentVersionService:
             raise PermissionError("You don't have permission to restore this document")
         
         # Восстановление содержимого
+        base_version = document.version
         new_version = document.update_content(version.content)
         await self.version_repository.create(new_version)
         
-        return await self.document_repository.update(document)
\ No newline at end of file
+        restored_document = await self.document_repository.update(document, expected_version=base_version)
+        if restored_document is None:
+            raise ValueError("Document was modified concurrently")
+        await self.session.commit()
+        
+        await invalidate_document_cache(self.redis, document_uuid)
+        return restored_document
\ No newline at end of file
@@ -1,4 +1,4 @@
-from app.domains.identity.entities import User
+from app.domains.identity.entities import User, UserPublic
 from app.domains.identity.schemas import (
     UserBase, UserCreate, UserLogin, UserUpdate, 
     UserResponse, Token, TokenData, PasswordChange
@@ -6,7 +6,7 @@ from app.domains.identity.schemas import (
 from app.domains.identity.services import IdentityService
 
 __all__ = [
-    "User",
+    "User", "UserPublic",
     "UserBase", "UserCreate", "UserLogin", "UserUpdate", 
     "UserResponse", "Token", "TokenData", "PasswordChange",
     "IdentityService"
@@ -1,7 +1,23 @@
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
-from passlib.context import CryptContext
+
+from app.core.security import verify_password
+
+
+@dataclass(frozen=True)
+class UserPublic:
+    """Публичное представление пользователя без хеша пароля"""
+    
+    __slots__ = ("uuid", "email", "username", "is_active", "created_at", "updated_at")
+    
+    uuid: uuid.UUID
+    email: str
+    username: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
 
 
 class User:
@@ -22,14 +38,18 @@ class User:
         self.username = username
         self.password_hash = password_hash
         self.is_active = is_active
-        self.created_at = created_at or datetime.utcnow()
-        self.updated_at = updated_at or datetime.utcnow()
         
-        self._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # Строки из БД приходят с обеими метками времени, и utcnow не вызывается
+        if created_at is None:
+            created_at = datetime.utcnow()
+        if updated_at is None:
+            updated_at = created_at
+        self.created_at = created_at
+        self.updated_at = updated_at
     
     def authenticate(self, password: str) -> bool:
         """Проверка пароля пользователя"""
-        return self._pwd_context.verify(password[:72], self.password_hash)
+        return verify_password(password, self.password_hash)
     
     def update_profile(self, username: Optional[str] = None, email: Optional[str] = None) -> None:
         """Обновление профиля пользователя"""
@@ -50,12 +70,8 @@ class User:
         self.updated_at = datetime.utcnow()
     
     @classmethod
-    def create_user(cls, email: str, username: str, password: str) -> "User":
-        """Создание нового пользователя с хешированием пароля"""
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        # bcrypt имеет ограничение 72 байта, обрезаем пароль если нужно
-        password_hash = pwd_context.hash(password[:72])
-        
+    def create_user(cls, email: str, username: str, password_hash: str) -> "User":
+        """Создание нового пользователя с готовым хешем пароля"""
         return cls(
             uuid=uuid.uuid4(),
             email=email,
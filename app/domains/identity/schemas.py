@@ -1,8 +1,31 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
 from typing import Optional
 from datetime import datetime
+import re
 import uuid
 
+# Буквы, цифры, '_' и '-', причем хотя бы одна буква или цифра
+_USERNAME_RE = re.compile(r'(?=[\w-]*[^\W_])[\w-]+')
+
+# Быстрая проверка типичного пароля за один проход: строчная, заглавная
+# латиница и цифра. Остальные случаи проверяются по правилам ниже
+_PASSWORD_RE = re.compile(r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d).{8,}', re.DOTALL)
+
+
+def _check_password_strength(v: str) -> str:
+    """Проверка сложности пароля"""
+    if _PASSWORD_RE.fullmatch(v):
+        return v
+    if len(v) < 8:
+        raise ValueError('Password must be at least 8 characters long')
+    if not any(c.isupper() for c in v):
+        raise ValueError('Password must contain at least one uppercase letter')
+    if not any(c.islower() for c in v):
+        raise ValueError('Password must contain at least one lowercase letter')
+    if not any(c.isdigit() for c in v):
+        raise ValueError('Password must contain at least one digit')
+    return v
+
 
 class UserBase(BaseModel):
     """Базовая схема пользователя"""
@@ -12,7 +35,7 @@ class UserBase(BaseModel):
     @field_validator('username')
     @classmethod
     def validate_username(cls, v):
-        if not v.replace('_', '').replace('-', '').isalnum():
+        if not _USERNAME_RE.fullmatch(v):
             raise ValueError('Username must contain only alphanumeric characters, underscores, and hyphens')
         return v
 
@@ -24,15 +47,7 @@ class UserCreate(UserBase):
     @field_validator('password')
     @classmethod
     def validate_password(cls, v):
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        if not any(c.isupper() for c in v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not any(c.islower() for c in v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not any(c.isdigit() for c in v):
-            raise ValueError('Password must contain at least one digit')
-        return v
+        return _check_password_strength(v)
 
 
 class UserLogin(BaseModel):
@@ -49,7 +64,7 @@ class UserUpdate(BaseModel):
     @field_validator('username')
     @classmethod
     def validate_username(cls, v):
-        if v is not None and not v.replace('_', '').replace('-', '').isalnum():
+        if v is not None and not _USERNAME_RE.fullmatch(v):
             raise ValueError('Username must contain only alphanumeric characters, underscores, and hyphens')
         return v
 
@@ -61,12 +76,7 @@ class UserResponse(UserBase):
     created_at: datetime
     updated_at: datetime
     
-    model_config = ConfigDict(
-        from_attributes=True,
-        json_encoders={
-            datetime: lambda v: v.isoformat()
-        }
-    )
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -89,12 +99,4 @@ class PasswordChange(BaseModel):
     @field_validator('new_password')
     @classmethod
     def validate_new_password(cls, v):
-        if len(v) < 8:
-            raise ValueError('Password must be at least 8 characters long')
-        if not any(c.isupper() for c in v):
-            raise ValueError('Password must contain at least one uppercase letter')
-        if not any(c.islower() for c in v):
-            raise ValueError('Password must contain at least one lowercase letter')
-        if not any(c.isdigit() for c in v):
-            raise ValueError('Password must contain at least one digit')
-        return v
\ No newline at end of file
+        return _check_password_strength(v)
\ No newline at end of file
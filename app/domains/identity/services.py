@@ -1,12 +1,16 @@
-from typing import Optional
+from typing import Optional, List
+from dataclasses import replace
 from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import uuid
 from datetime import datetime, timedelta
 
 from app.db.repositories.user_repository import UserRepository
-from app.domains.identity.entities import User
+from app.domains.identity.entities import User, UserPublic
 from app.domains.identity.schemas import UserCreate, UserUpdate, UserLogin
-from app.core.security import create_access_token, verify_token
+from app.core.security import (
+    create_access_token, verify_token, encode_subject, decode_subject, get_password_hash
+)
 
 
 class IdentityService:
@@ -18,30 +22,43 @@ class IdentityService:
     
     async def register_user(self, user_data: UserCreate) -> User:
         """Регистрация нового пользователя"""
-        # Проверка существования email и username
-        if await self.user_repository.email_exists(user_data.email):
-            raise ValueError("Email already registered")
+        # bcrypt считается в потоке параллельно с проверкой уникальности
+        hash_task = asyncio.ensure_future(asyncio.to_thread(get_password_hash, user_data.password))
         
-        if await self.user_repository.username_exists(user_data.username):
-            raise ValueError("Username already taken")
+        try:
+            # Проверка существования email и username
+            email_taken, username_taken = await self.user_repository.conflicts(
+                user_data.email, user_data.username
+            )
+            
+            if email_taken:
+                raise ValueError("Email already registered")
+            
+            if username_taken:
+                raise ValueError("Username already taken")
+        except BaseException:
+            hash_task.cancel()
+            raise
         
         # Создание пользователя
         user = User.create_user(
             email=user_data.email,
             username=user_data.username,
-            password=user_data.password
+            password_hash=await hash_task
         )
         
-        return await self.user_repository.create(user)
+        created_user = await self.user_repository.create(user)
+        await self.session.commit()
+        return created_user
     
     async def authenticate_user(self, login_data: UserLogin) -> Optional[User]:
         """Аутентификация пользователя"""
-        user = await self.user_repository.get_by_email(login_data.email)
+        user = await self.user_repository.get_by_email_with_hash(login_data.email)
         
         if not user or not user.is_active:
             return None
         
-        if not user.authenticate(login_data.password):
+        if not await asyncio.to_thread(user.authenticate, login_data.password):
             return None
         
         return user
@@ -55,48 +72,54 @@ class IdentityService:
         
         # Создание JWT токена
         token_data = {
-            "sub": str(user.uuid),
+            "sub": encode_subject(user.uuid),
             "username": user.username,
             "email": user.email
         }
         
         return create_access_token(data=token_data)
     
-    async def get_user_by_uuid(self, user_uuid: uuid.UUID) -> Optional[User]:
+    async def get_user_by_uuid(self, user_uuid: uuid.UUID) -> Optional[UserPublic]:
         """Получение пользователя по UUID"""
-        return await self.user_repository.get_by_uuid(user_uuid)
+        return await self.user_repository.get_by_uuid_public(user_uuid)
     
-    async def get_user_by_email(self, email: str) -> Optional[User]:
+    async def get_user_by_email(self, email: str) -> Optional[UserPublic]:
         """Получение пользователя по email"""
         return await self.user_repository.get_by_email(email)
     
-    async def get_user_by_username(self, username: str) -> Optional[User]:
+    async def get_user_by_username(self, username: str) -> Optional[UserPublic]:
         """Получение пользователя по username"""
         return await self.user_repository.get_by_username(username)
     
-    async def update_user_profile(self, user_uuid: uuid.UUID, update_data: UserUpdate) -> Optional[User]:
+    async def update_user_profile(self, user_uuid: uuid.UUID, update_data: UserUpdate) -> Optional[UserPublic]:
         """Обновление профиля пользователя"""
-        user = await self.user_repository.get_by_uuid(user_uuid)
+        user = await self.user_repository.get_by_uuid_public(user_uuid)
         
         if not user:
             return None
         
         # Проверка уникальности email и username при изменении
-        if update_data.email and update_data.email != user.email:
-            if await self.user_repository.email_exists(update_data.email):
-                raise ValueError("Email already registered")
+        new_email = update_data.email if update_data.email != user.email else None
+        new_username = update_data.username if update_data.username != user.username else None
+        email_taken, username_taken = await self.user_repository.conflicts(new_email, new_username)
         
-        if update_data.username and update_data.username != user.username:
-            if await self.user_repository.username_exists(update_data.username):
-                raise ValueError("Username already taken")
+        if email_taken:
+            raise ValueError("Email already registered")
+        
+        if username_taken:
+            raise ValueError("Username already taken")
         
         # Обновление данных
-        user.update_profile(
-            username=update_data.username,
-            email=update_data.email
+        user = replace(
+            user,
+            username=update_data.username or user.username,
+            email=update_data.email or user.email,
+            updated_at=datetime.utcnow()
         )
         
-        return await self.user_repository.update(user)
+        updated_user = await self.user_repository.update(user)
+        await self.session.commit()
+        return updated_user
     
     async def change_user_password(self, user_uuid: uuid.UUID, current_password: str, new_password: str) -> bool:
         """Смена пароля пользователя"""
@@ -105,17 +128,16 @@ class IdentityService:
         if not user:
             return False
         
-        # Проверка текущего пароля
-        if not user.authenticate(current_password):
+        # Проверка текущего пароля; bcrypt выполняется в потоке, не блокируя цикл событий
+        if not await asyncio.to_thread(user.authenticate, current_password):
             raise ValueError("Current password is incorrect")
         
         # Установка нового пароля
-        from passlib.context import CryptContext
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        user.password_hash = pwd_context.hash(new_password[:72])
+        user.password_hash = await asyncio.to_thread(get_password_hash, new_password)
         user.updated_at = datetime.utcnow()
         
-        await self.user_repository.update(user)
+        await self.user_repository.update_password(user.uuid, user.password_hash, user.updated_at)
+        await self.session.commit()
         return True
     
     async def deactivate_user(self, user_uuid: uuid.UUID) -> bool:
@@ -127,6 +149,7 @@ class IdentityService:
         
         user.deactivate()
         await self.user_repository.update(user)
+        await self.session.commit()
         return True
     
     async def activate_user(self, user_uuid: uuid.UUID) -> bool:
@@ -138,22 +161,25 @@ class IdentityService:
         
         user.activate()
         await self.user_repository.update(user)
+        await self.session.commit()
         return True
     
     async def delete_user(self, user_uuid: uuid.UUID) -> bool:
         """Удаление пользователя"""
-        return await self.user_repository.delete(user_uuid)
+        deleted = await self.user_repository.delete(user_uuid)
+        await self.session.commit()
+        return deleted
     
-    async def get_current_user_from_token(self, token: str) -> Optional[User]:
+    async def get_current_user_from_token(self, token: str) -> Optional[UserPublic]:
         """Получение текущего пользователя из JWT токена"""
         try:
             payload = verify_token(token)
-            user_uuid = uuid.UUID(payload.get("sub"))
+            user_uuid = decode_subject(payload.get("sub"))
             
             if user_uuid is None:
                 return None
             
-            user = await self.user_repository.get_by_uuid(user_uuid)
+            user = await self.user_repository.get_by_uuid_public(user_uuid)
             
             if user is None or not user.is_active:
                 return None
@@ -163,6 +189,6 @@ class IdentityService:
         except Exception:
             return None
     
-    async def list_users(self, limit: int = 100, offset: int = 0) -> list[User]:
+    async def list_users(self, limit: int = 100, offset: int = 0) -> List[UserPublic]:
         """Получение списка пользователей"""
         return await self.user_repository.get_all(limit, offset)
\ No newline at end of file
@@ -1,58 +1,104 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, ORJSONResponse
+from contextlib import asynccontextmanager
+from typing import Optional
+import hashlib
 import os
 
-from app.api.http.health import router as health_router
-from app.api.http.auth import router as auth_router
-from app.api.http.users import router as users_router
-from app.api.http.documents import router as documents_router
-from app.api.http.collaboration import router as collaboration_router
-from app.api.ws.sync import router as websocket_router
+from app.core.config import settings
+from app.core.static import NoCacheStaticFiles, CachedStaticFiles
+
+from app.api import api_router
+from app.services.persistence import snapshot_flusher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Фоновые задачи приложения: запуск при старте, остановка при завершении"""
+    snapshot_flusher.start()
+    try:
+        yield
+    finally:
+        # Оставшиеся правки записываются до остановки
+        await snapshot_flusher.stop()
+
+
+IS_PRODUCTION = settings.env == "production"
 
 app = FastAPI(
     title="DocCollab",
     description="Веб-приложение для совместного редактирования документов",
-    version="1.0.0"
+    version="1.0.0",
+    # В продакшене схема OpenAPI и страницы документации не строятся
+    docs_url=None if IS_PRODUCTION else "/docs",
+    redoc_url=None if IS_PRODUCTION else "/redoc",
+    openapi_url=None if IS_PRODUCTION else "/openapi.json",
+    # orjson сериализует UUID и datetime нативно и быстрее stdlib json
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Настройка CORS для работы с frontend
+# Явный список источников (с allow_credentials "*" браузеры не принимают);
+# max_age позволяет браузеру кешировать preflight-запросы на сутки
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # В продакшене указать конкретные домены
+    allow_origins=settings.cors_origin_list,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,
 )
 
-# Подключаем статические файлы без кэширования для разработки
+if IS_PRODUCTION:
+    # Сжатие ответов API; предварительно сжатую статику middleware не трогает
+    app.add_middleware(GZipMiddleware, minimum_size=500)
+
+# Статика: в продакшене с долгим кэшированием, в разработке без кэширования
 if os.path.exists("app/static"):
-    class NoCacheStaticFiles(StaticFiles):
-        async def get_response(self, path: str, scope):
-            response = await super().get_response(path, scope)
-            if response:
-                response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-                response.headers["Pragma"] = "no-cache"
-                response.headers["Expires"] = "0"
-            return response
-    
-    app.mount("/static", NoCacheStaticFiles(directory="app/static"), name="static")
+    static_files_class = CachedStaticFiles if IS_PRODUCTION else NoCacheStaticFiles
+    app.mount("/static", static_files_class(directory="app/static"), name="static")
 
 # Подключаем роутеры
-app.include_router(health_router)
-app.include_router(auth_router)
-app.include_router(users_router)
-app.include_router(documents_router)
-app.include_router(collaboration_router)
-app.include_router(websocket_router)
+app.include_router(api_router)
+
+
+# Путь к главной странице определяется один раз при запуске
+INDEX_PATH = os.path.abspath("app/static/index.html") if os.path.isfile("app/static/index.html") else None
+
+# Страница без версии в URL: браузер хранит копию, но проверяет ее по Last-Modified / ETag
+INDEX_HEADERS = {"Cache-Control": "no-cache"}
+
+# В продакшене страница меняется только при деплое: она читается в память один
+# раз, и запрос обслуживается без обращений к файловой системе. В разработке
+# файл читается с диска, чтобы правки были видны без перезапуска
+INDEX_BYTES: Optional[bytes] = None
+INDEX_ETAG: Optional[str] = None
+if IS_PRODUCTION and INDEX_PATH:
+    with open(INDEX_PATH, "rb") as index_file:
+        INDEX_BYTES = index_file.read()
+    INDEX_ETAG = f'"{hashlib.blake2b(INDEX_BYTES, digest_size=8).hexdigest()}"'
+
+
+def _index_response(request: Request) -> Response:
+    """Главная страница; при совпадении If-None-Match - пустой ответ 304"""
+    if INDEX_BYTES is None:
+        return FileResponse(INDEX_PATH, headers=INDEX_HEADERS)
+    
+    headers = {"ETag": INDEX_ETAG, **INDEX_HEADERS}
+    if_none_match = request.headers.get("if-none-match", "")
+    if INDEX_ETAG in (tag.strip().lstrip("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(INDEX_BYTES, media_type="text/html", headers=headers)
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Корневой эндпоинт - отдаем главную страницу"""
-    if os.path.exists("app/static/index.html"):
-        return FileResponse("app/static/index.html")
+    if INDEX_PATH:
+        return _index_response(request)
     return {
         "message": "DocCollab API",
         "version": "1.0.0",
@@ -63,8 +109,8 @@ async def root():
 
 
 @app.get("/app")
-async def app_page():
+async def app_page(request: Request):
     """Эндпоинт для приложения"""
-    if os.path.exists("app/static/index.html"):
-        return FileResponse("app/static/index.html")
+    if INDEX_PATH:
+        return _index_response(request)
     return {"error": "Frontend not found"}
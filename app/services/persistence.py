@@ -0,0 +1,132 @@
+from typing import Dict, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+import uuid
+
+from app.core.db import SessionLocal
+from app.domains.documents.services import DocumentService
+
+logger = logging.getLogger(__name__)
+
+# Период записи накопленного содержимого документов, в секундах
+SNAPSHOT_FLUSH_INTERVAL = 0.2
+
+# Через сколько секунд без новых правок записанное содержимое фиксируется версией
+SNAPSHOT_IDLE_TIMEOUT = 10.0
+
+
+class SnapshotFlusher:
+    """Отложенная запись содержимого документов, приходящего по WebSocket
+
+    Правки накапливаются в памяти: для каждого документа хранится только
+    последний снимок, его автор и время получения. Фоновая задача раз в
+    SNAPSHOT_FLUSH_INTERVAL записывает все снимки одним UPDATE через
+    DocumentService.apply_snapshots: с проверкой прав и без перезаписи более
+    поздних изменений (REST-правки, восстановления версии). Версия документа
+    создается не на каждую запись, а когда правки затихли на
+    SNAPSHOT_IDLE_TIMEOUT или участник отключился.
+    """
+
+    def __init__(self, interval: float = SNAPSHOT_FLUSH_INTERVAL, idle_timeout: float = SNAPSHOT_IDLE_TIMEOUT):
+        self._interval = interval
+        self._idle_timeout = idle_timeout
+        self._pending: Dict[uuid.UUID, Tuple[uuid.UUID, str, datetime]] = {}
+        # Записанные, но еще не зафиксированные версией правки:
+        # автор последнего снимка и момент записи по time.monotonic()
+        self._unversioned: Dict[uuid.UUID, Tuple[uuid.UUID, float]] = {}
+        self._released: Set[uuid.UUID] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, document_uuid: uuid.UUID, user_uuid: uuid.UUID, content: str) -> None:
+        """Постановка снимка документа в очередь записи; более новый заменяет старый"""
+        self._pending[document_uuid] = (user_uuid, content, datetime.now(timezone.utc))
+
+    def release(self, document_uuid: uuid.UUID) -> None:
+        """Участник отключился: правки документа фиксируются версией при следующей записи"""
+        self._released.add(document_uuid)
+
+    def start(self) -> None:
+        """Запуск фоновой записи"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой записи с сохранением оставшихся правок и их версий"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._write_pending()
+        await self._create_versions(force=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Snapshot flush failed: {e}")
+
+    async def flush(self) -> None:
+        """Запись накопленных снимков и версии для затихших документов"""
+        await self._write_pending()
+        await self._create_versions()
+
+    async def _write_pending(self) -> None:
+        """Запись всех накопленных снимков одной транзакцией"""
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            async with SessionLocal() as session:
+                applied = await DocumentService(session).apply_snapshots(pending)
+        except Exception:
+            # Возвращаем несохраненное, не затирая снимки, пришедшие за время записи
+            for document_uuid, snapshot in pending.items():
+                self._pending.setdefault(document_uuid, snapshot)
+            raise
+
+        written_at = time.monotonic()
+        for document_uuid in applied:
+            self._unversioned[document_uuid] = (pending[document_uuid][0], written_at)
+
+        dropped = len(pending) - len(applied)
+        if dropped:
+            # Нет права на редактирование или документ изменили после снимка
+            logger.info(f"{dropped} snapshot(s) dropped as unauthorized or stale")
+
+    async def _create_versions(self, force: bool = False) -> None:
+        """Версии для документов, правки которых затихли или участник отключился"""
+        now = time.monotonic()
+        due = [
+            document_uuid
+            for document_uuid, (_, written_at) in self._unversioned.items()
+            if force or (
+                document_uuid not in self._pending
+                and (document_uuid in self._released or now - written_at >= self._idle_timeout)
+            )
+        ]
+        self._released.clear()
+
+        for document_uuid in due:
+            user_uuid, written_at = self._unversioned.pop(document_uuid)
+            try:
+                async with SessionLocal() as session:
+                    await DocumentService(session).create_snapshot_version(document_uuid, user_uuid)
+            except PermissionError:
+                logger.warning(f"User {user_uuid} may not edit document {document_uuid}; version skipped")
+            except ValueError as e:
+                # Документ изменили через REST: та правка уже создала свою версию
+                logger.info(f"Version for document {document_uuid} skipped: {e}")
+            except Exception as e:
+                self._unversioned.setdefault(document_uuid, (user_uuid, written_at))
+                logger.error(f"Version for document {document_uuid} not created, will retry: {e}")
+
+
+snapshot_flusher = SnapshotFlusher()
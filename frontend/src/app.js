@@ -586,17 +586,29 @@ class DocCollabApp {
         if (!this.currentDocument) return;
         
         try {
-            const response = await this.apiRequest(`/documents/${this.currentDocument.uuid}/export`, {
+            // Экспорт приходит потоком файла, а не JSON, поэтому apiRequest не подходит
+            const response = await fetch(`${this.apiBase}/documents/${this.currentDocument.uuid}/export`, {
                 method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ format: 'txt' })
             });
             
+            if (!response.ok) {
+                throw new Error('Export failed');
+            }
+            
+            const disposition = response.headers.get('Content-Disposition') || '';
+            const filenameMatch = disposition.match(/filename\*=UTF-8''([^;]+)/);
+            const filename = filenameMatch
+                ? decodeURIComponent(filenameMatch[1])
+                : `${this.currentDocument.title}.txt`;
+            
             // Создаем ссылку для скачивания
-            const blob = new Blob([response.content], { type: 'text/plain' });
+            const blob = await response.blob();
             const url = window.URL.createObjectURL(blob);
             const a = window.document.createElement('a');
             a.href = url;
-            a.download = response.filename;
+            a.download = filename;
             window.document.body.appendChild(a);
             a.click();
             window.document.body.removeChild(a);